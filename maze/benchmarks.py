@@ -0,0 +1,82 @@
+# Micro-benchmarks for the maze generators.
+# Run: python benchmarks.py [name ...]
+
+import random
+import sys
+import time
+import tracemalloc
+
+from maze_generator import create_maze, GENERATORS
+from maze_path_solver import PATH_SOLVERS
+
+def bench_generate(sizes=(101, 501, 1001, 2001, 4001), seed=1):
+  # Carved cells per second of the DFS generator for growing square mazes
+  print(f"{'size':>11}{'cells':>12}{'seconds':>10}{'cells/s':>12}")
+  for size in sizes:
+    started = time.perf_counter()
+    create_maze(size, size, 'dfs', random.Random(seed))
+    elapsed = time.perf_counter() - started
+    cells = ((size - 1) // 2) ** 2
+    print(f"{f'{size}x{size}':>11}{cells:>12}{elapsed:>10.3f}{cells / elapsed:>12.0f}")
+
+def bench_generators(sizes=(201, 1001, 2001), seed=1):
+  # Cells per second and peak traced memory (Python and NumPy allocations) of
+  # every generator. Memory is measured in a separate run, tracing slows it down.
+  print(f"{'generator':<14}{'size':>11}{'seconds':>10}{'cells/s':>12}{'peak MB':>10}")
+  for algorithm in GENERATORS:
+    for size in sizes:
+      started = time.perf_counter()
+      create_maze(size, size, algorithm, random.Random(seed))
+      elapsed = time.perf_counter() - started
+      tracemalloc.start()
+      create_maze(size, size, algorithm, random.Random(seed))
+      _, peak = tracemalloc.get_traced_memory()
+      tracemalloc.stop()
+      cells = ((size - 1) // 2) ** 2
+      print(f"{algorithm:<14}{f'{size}x{size}':>11}{elapsed:>10.3f}{cells / elapsed:>12.0f}{peak / 2 ** 20:>10.1f}")
+
+def bench_storage(sizes=(1001, 2001, 4001), seed=1):
+  # Bytes per position of the maze as lists of one character strings (the
+  # original MazeModel.map) and packed to bits, and the cost of the queries
+  print(f"{'size':>11}{'lists B/cell':>14}{'packed B/cell':>15}{'is_blocked (us)':>17}{'statistics (s)':>16}")
+  for size in sizes:
+    maze_model = create_maze(size, size, 'binary_tree', random.Random(seed))
+    tracemalloc.start()
+    rows = [list(row) for row in maze_model.map]
+    lists, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del rows
+    cells = size * size
+    rng = random.Random(seed)
+    coords = [(rng.randrange(size), rng.randrange(size)) for _ in range(100000)]
+    started = time.perf_counter()
+    for c in coords:
+      maze_model.is_blocked(c)
+    is_blocked = (time.perf_counter() - started) / len(coords) * 1e6
+    started = time.perf_counter()
+    maze_model.cell_statistics()
+    statistics = time.perf_counter() - started
+    print(f"{f'{size}x{size}':>11}{lists / cells:>14.2f}{maze_model.bits.nbytes / cells:>15.3f}"
+          f"{is_blocked:>17.3f}{statistics:>16.3f}")
+
+def bench_solvers(sizes=(101, 501, 1001, 2001), seed=1):
+  # Solve time and expanded nodes of the shortest path solvers on DFS mazes
+  print(f"{'solver':<19}{'size':>11}{'path':>9}{'expanded':>11}{'seconds':>10}")
+  for size in sizes:
+    maze_model = create_maze(size, size, 'dfs', random.Random(seed))
+    for name, solver_class in PATH_SOLVERS.items():
+      solver = solver_class()
+      path = solver.solve(maze_model)
+      print(f"{name:<19}{f'{size}x{size}':>11}{len(path):>9}{solver.nodes_expanded:>11}{solver.elapsed:>10.3f}")
+
+BENCHMARKS = {
+  'generate': bench_generate,
+  'generators': bench_generators,
+  'storage': bench_storage,
+  'solvers': bench_solvers,
+}
+
+if __name__ == '__main__':
+  for name in sys.argv[1:] or BENCHMARKS:
+    print(f'--- {name} ---')
+    BENCHMARKS[name]()
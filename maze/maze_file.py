@@ -0,0 +1,106 @@
+# ---------- Bit-packed maze files ----------
+# One bit per grid position (1 = blocked), every row padded to whole bytes
+# (the layout of PackedMazeModel.bits), behind a header with the size and the entrance and exit coordinates.
+# Rows are written as they are generated, so Eller's generator can write mazes
+# that never fit in memory, and MappedMazeModel reads them back through mmap,
+# touching only the pages of the rows that are looked at.
+#
+# Run: python maze_file.py width height path [--seed N]
+
+import argparse
+import logging
+import mmap
+import random
+import struct
+
+import numpy as np
+
+from maze_model import MazeModel, PackedMazeModel, CELL_BLOCKED, CELL_FREE
+from maze_generator import EllerMazeGenerator
+
+MAZE_MAGIC = b'MAZ1'
+# magic, width, height, entrance x, entrance y, exit x, exit y
+MAZE_HEADER = struct.Struct('<4sIIIIII')
+
+def row_bytes(width):
+  return (width + 7) // 8
+
+def write_maze(f, width, height, rows, entrance_coords, exit_coords, cell_blocked=CELL_BLOCKED):
+  # Packs and writes the grid rows (bytes of one character per position) one
+  # at a time, the entrance and the exit are opened on the way
+  f.write(MAZE_HEADER.pack(MAZE_MAGIC, width, height, *entrance_coords, *exit_coords))
+  blocked = ord(cell_blocked)
+  num_of_rows = 0
+  for y, row in enumerate(rows):
+    bits = np.frombuffer(row, dtype=np.uint8) == blocked
+    if len(bits) != width:
+      raise Exception(f'Row {y} has {len(bits)} cells instead of {width}.')
+    for x, opening_y in (entrance_coords, exit_coords):
+      if opening_y == y:
+        bits[x] = False
+    f.write(np.packbits(bits).tobytes())
+    num_of_rows += 1
+  if num_of_rows != height:
+    raise Exception(f'Maze has {num_of_rows} rows instead of {height}.')
+
+def save_maze(path, maze_model: MazeModel):
+  if isinstance(maze_model, PackedMazeModel):
+    # Same layout as the file, the rows are written as they are
+    with open(path, 'wb') as f:
+      f.write(MAZE_HEADER.pack(MAZE_MAGIC, maze_model.get_width(), maze_model.get_height(),
+                               *maze_model.get_entrance_coords(), *maze_model.get_exit_coords()))
+      f.write(maze_model.bits.tobytes())
+    return
+  rows = (''.join(row).encode('ascii') for row in maze_model.map)
+  with open(path, 'wb') as f:
+    write_maze(f, maze_model.get_width(), maze_model.get_height(), rows,
+               maze_model.get_entrance_coords(), maze_model.get_exit_coords())
+
+def generate_maze_file(path, width, height, rng: random.Random = None):
+  # Streams an Eller maze to the file, memory stays O(width)
+  assert width % 2 != 0
+  assert height % 2 != 0
+
+  generator = EllerMazeGenerator(rng)
+  entrance_coords, exit_coords = generator.random_openings(width, height)
+  with open(path, 'wb') as f:
+    write_maze(f, width, height, generator.rows(width, height, CELL_BLOCKED, CELL_FREE),
+               entrance_coords, exit_coords)
+
+class MappedMazeModel(PackedMazeModel):
+  # PackedMazeModel over the bits of a maze file in place, pages are only read
+  # when the rows are accessed
+  def __init__(self, path):
+    self.path = path
+    with open(path, 'rb') as f:
+      self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, width, height, *coords = MAZE_HEADER.unpack_from(self._data)
+    if magic != MAZE_MAGIC or len(self._data) != MAZE_HEADER.size + height * row_bytes(width):
+      self._data.close()
+      raise Exception(f'{path} is not a maze file.')
+    bits = np.frombuffer(self._data, dtype=np.uint8, count=height * row_bytes(width), offset=MAZE_HEADER.size)
+    super().__init__(bits.reshape(height, row_bytes(width)), width, tuple(coords[:2]), tuple(coords[2:]))
+
+  def close(self):
+    self.release()
+    self._data.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    self.close()
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='Generate a bit-packed maze file row by row.')
+  parser.add_argument('width', type=int)
+  parser.add_argument('height', type=int)
+  parser.add_argument('path')
+  parser.add_argument('--seed', type=int, default=None)
+  args = parser.parse_args(argv)
+  generate_maze_file(args.path, args.width, args.height, random.Random(args.seed))
+  logging.info('Wrote %dx%d maze to %s', args.width, args.height, args.path)
+
+if __name__ == '__main__':
+  logging.basicConfig(level=logging.INFO)
+  main()
@@ -1,65 +1,300 @@
 from abc import ABC, abstractmethod
+from array import array
+from itertools import chain, permutations
 import random
 
-from maze_model import MazeModel, CELL_BLOCKED, CELL_FREE
+import numpy as np
+
+from maze_model import MazeModel, PackedMazeModel, pack_grid, CELL_BLOCKED, CELL_FREE
+
+# Mazes have odd dimensions: cells are at odd (x, y), the positions between two
+# cells are walls or passages and the outer border is wall except for the
+# entrance and the exit. Generators carve into a flat grid (index y * width + x)
+# of one byte per position, the models they return store it packed to one bit
+# per position (PackedMazeModel).
+
+# Walls the Kruskal generator converts to Python ints at once
+KRUSKAL_CHUNK = 1 << 16
+# Random direction orders the DFS generator draws at once
+DFS_CHUNK = 1 << 16
 
 class MazeGenerator(ABC):
+  def __init__(self, rng: random.Random = None):
+    self.rng = rng if rng is not None else random.Random()
+
   @abstractmethod
   def generate_maze(self, width: int, height: int, cell_blocked: str, cell_free: str) -> MazeModel:
     pass
 
-def dfs_generate_maze(width, height):
-  generator = DfsMazeGenerator()
+  def random_openings(self, width, height):
+    # Random entrance and exit on two different outer walls
+    rng = self.rng
+    possible_sides = ['top', 'bottom', 'left', 'right']
+    entrance_side = rng.choice(possible_sides)
+    exit_side = rng.choice([s for s in possible_sides if s != entrance_side])
+
+    def open_side(side):
+      if side == 'top':
+        return (rng.randrange(1, width, 2), 0)
+      elif side == 'bottom':
+        return (rng.randrange(1, width, 2), height - 1)
+      elif side == 'left':
+        return (0, rng.randrange(1, height, 2))
+      elif side == 'right':
+        return (width - 1, rng.randrange(1, height, 2))
+
+    return open_side(entrance_side), open_side(exit_side)
+
+  def make_model(self, maze, width, height, cell_blocked):
+    # Packs the carved grid (flat bytes or a NumPy array) and opens the
+    # entrance and the exit
+    bits = pack_grid(maze, width, height, cell_blocked)
+    entrance_coords, exit_coords = self.random_openings(width, height)
+    for x, y in (entrance_coords, exit_coords):
+      bits[y, x >> 3] &= ~(0x80 >> (x & 7)) & 0xFF
+    return PackedMazeModel(bits, width, entrance_coords, exit_coords)
+
+def dfs_generate_maze(width, height, rng: random.Random = None):
+  return create_maze(width, height, 'dfs', rng)
+
+def create_generator(algorithm, rng: random.Random = None) -> MazeGenerator:
+  if algorithm not in GENERATORS:
+    raise Exception(f'Unknown maze generator: {algorithm}')
+  return GENERATORS[algorithm](rng)
+
+def create_maze(width, height, algorithm='dfs', rng: random.Random = None):
+  generator = create_generator(algorithm, rng)
   return generator.generate_maze(width, height, CELL_BLOCKED, CELL_FREE)
 
 class DfsMazeGenerator(MazeGenerator):
+  # Depth-first carving with an explicit stack, so the maze size is not limited
+  # by the recursion limit. Cells are addressed by their flat index only.
   def generate_maze(self, width: int, height: int, cell_blocked: str, cell_free: str) -> MazeModel:
     # Ensure odd dimensions
     assert width % 2 != 0
     assert height % 2 != 0
 
-    maze = [[cell_blocked for _ in range(width)] for _ in range(height)]
-    directions = [(-2, 0), (2, 0), (0, -2), (0, 2)]
-
-    def carve(y, x):
-      maze[y][x] = cell_free
-      random.shuffle(directions)
-      for dy, dx in directions:
-        ny, nx = y + dy, x + dx
-        if 1 <= ny < height - 1 and 1 <= nx < width - 1 and maze[ny][nx] == cell_blocked:
-          maze[y + dy // 2][x + dx // 2] = cell_free
-          carve(ny, nx)
+    rng = self.rng
+    size = width * height
+    free = ord(cell_free)
+    # The grid doubles as the visited mask: cells not carved yet are 0, every
+    # other position is wall or free. 2 extra rows of wall at the end catch the
+    # steps past the top (negative index) and the bottom wall.
+    maze = bytearray(cell_blocked.encode('ascii') * (size + 2 * width))
+    for y in range(1, height - 1, 2):
+      maze[y * width + 1:(y + 1) * width - 1:2] = bytes((width - 1) // 2)
+    # Trying the directions in a random order and taking the first unvisited
+    # neighbor picks a uniformly random one, without building a list per step.
+    orders = list(permutations((-2, 2, -2 * width, 2 * width)))
 
     # Start carving from a random odd cell
-    start_y = random.randrange(1, height, 2)
-    start_x = random.randrange(1, width, 2)
-    carve(start_y, start_x)
+    cell = rng.randrange(1, height, 2) * width + rng.randrange(1, width, 2)
+    maze[cell] = free
+    stack = array('q', [cell])
+    push = stack.append
+    pop = stack.pop
+    # Every step either carves a cell or backtracks from one, so all cells but
+    # the first take exactly 2 steps, and the first one is left on the stack.
+    cells = ((width - 1) // 2) * ((height - 1) // 2)
+    for order in chain.from_iterable(self.random_orders(2 * (cells - 1))):
+      a, b, c, d = orders[order]
+      if not maze[cell + a]:
+        d = a
+      elif not maze[cell + b]:
+        d = b
+      elif not maze[cell + c]:
+        d = c
+      elif maze[cell + d]:
+        # Dead end, backtrack
+        pop()
+        cell = stack[-1]
+        continue
+      maze[cell + (d >> 1)] = free
+      cell += d
+      maze[cell] = free
+      push(cell)
 
-    # Choose random entrance and exit on outer walls
-    possible_sides = ['top', 'bottom', 'left', 'right']
-    entrance_side = random.choice(possible_sides)
-    exit_side = random.choice([s for s in possible_sides if s != entrance_side])
+    del maze[size:]
+    return self.make_model(maze, width, height, cell_blocked)
 
-    def open_side(side):
-      if side == 'top':
-        x = random.randrange(1, width, 2)
-        maze[0][x] = cell_free
-        return (x, 0)
-      elif side == 'bottom':
-        x = random.randrange(1, width, 2)
-        maze[height - 1][x] = cell_free
-        return (x, height - 1)
-      elif side == 'left':
-        y = random.randrange(1, height, 2)
-        maze[y][0] = cell_free
-        return (0, y)
-      elif side == 'right':
-        y = random.randrange(1, height, 2)
-        maze[y][width - 1] = cell_free
-        return (width - 1, y)
-
-    entrance_coords = open_side(entrance_side)
-    exit_coords = open_side(exit_side)
-  
-    maze_model = MazeModel(maze, entrance_coords, exit_coords)
-    return maze_model
+  def random_orders(self, count):
+    # Indices into the 24 direction orders, DFS_CHUNK bytes at a time
+    np_rng = np.random.default_rng(self.rng.getrandbits(64))
+    for start in range(0, count, DFS_CHUNK):
+      yield np_rng.integers(0, 24, min(DFS_CHUNK, count - start), dtype=np.uint8).tobytes()
+
+class EllerMazeGenerator(MazeGenerator):
+  # Eller's algorithm: builds the maze one row of cells at a time and only
+  # remembers which set every cell of the current row belongs to, so memory is
+  # O(width) apart from the rows already produced.
+  def generate_maze(self, width: int, height: int, cell_blocked: str, cell_free: str) -> MazeModel:
+    assert width % 2 != 0
+    assert height % 2 != 0
+
+    maze = bytearray().join(self.rows(width, height, cell_blocked, cell_free))
+    return self.make_model(maze, width, height, cell_blocked)
+
+  def rows(self, width, height, cell_blocked, cell_free):
+    # Yields the rows of the grid from top to bottom, without any opening
+    rand = self.rng.random
+    choose = self.rng.choice
+    blocked = ord(cell_blocked)
+    free = ord(cell_free)
+    num_of_columns = (width - 1) // 2
+    num_of_rows = (height - 1) // 2
+
+    yield bytes([blocked]) * width
+    # Set of every cell of the current row, numbered 0..num_of_columns - 1
+    sets = list(range(num_of_columns))
+    for r in range(num_of_rows):
+      last = r == num_of_rows - 1
+      parent = list(range(num_of_columns))
+
+      def find(s):
+        while parent[s] != s:
+          parent[s] = parent[parent[s]]
+          s = parent[s]
+        return s
+
+      # Join neighbors of different sets at random, all of them in the last row
+      row = bytearray([blocked]) * width
+      row[1:width - 1:2] = bytes([free]) * num_of_columns
+      for c in range(num_of_columns - 1):
+        a = find(sets[c])
+        b = find(sets[c + 1])
+        if a != b and (last or rand() < 0.5):
+          parent[b] = a
+          row[2 * c + 2] = free
+      yield bytes(row)
+      if last:
+        break
+
+      # Every set continues down at least once
+      sets = [find(s) for s in sets]
+      down = [rand() < 0.5 for _ in range(num_of_columns)]
+      members = {}
+      for c, s in enumerate(sets):
+        members.setdefault(s, []).append(c)
+      for s, columns in members.items():
+        if not any(down[c] for c in columns):
+          down[choose(columns)] = True
+
+      row = bytearray([blocked]) * width
+      # Cells below keep their set, the others start a new one
+      labels = {}
+      next_sets = []
+      for c in range(num_of_columns):
+        if down[c]:
+          row[2 * c + 1] = free
+          next_sets.append(labels.setdefault(sets[c], len(labels)))
+        else:
+          next_sets.append(None)
+      fresh = len(labels)
+      for c in range(num_of_columns):
+        if next_sets[c] is None:
+          next_sets[c] = fresh
+          fresh += 1
+      sets = next_sets
+      yield bytes(row)
+    yield bytes([blocked]) * width
+
+class BinaryTreeMazeGenerator(MazeGenerator):
+  # Every cell opens its north or its west wall, cells of the top row and the
+  # left column have only one choice. All cells are independent, so the whole
+  # maze is carved with a few NumPy operations.
+  def generate_maze(self, width: int, height: int, cell_blocked: str, cell_free: str) -> MazeModel:
+    assert width % 2 != 0
+    assert height % 2 != 0
+
+    np_rng = np.random.default_rng(self.rng.getrandbits(64))
+    free = ord(cell_free)
+    grid = np.full((height, width), ord(cell_blocked), dtype=np.uint8)
+    grid[1::2, 1::2] = free
+    north = np_rng.random(grid[1::2, 1::2].shape) < 0.5
+    north[0, :] = False
+    north[:, 0] = True
+    north[0, 0] = False
+    west = ~north
+    west[:, 0] = False
+    # Wall above and left of every cell
+    grid[0:height - 1:2, 1::2][north] = free
+    grid[1::2, 0:width - 1:2][west] = free
+    return self.make_model(grid, width, height, cell_blocked)
+
+class SidewinderMazeGenerator(MazeGenerator):
+  # Every row is cut into runs of cells joined east to west, each run opens the
+  # north wall of one random member. The top row is a single run. Runs are
+  # found for all rows at once with cumulative sums.
+  def generate_maze(self, width: int, height: int, cell_blocked: str, cell_free: str) -> MazeModel:
+    assert width % 2 != 0
+    assert height % 2 != 0
+
+    np_rng = np.random.default_rng(self.rng.getrandbits(64))
+    free = ord(cell_free)
+    grid = np.full((height, width), ord(cell_blocked), dtype=np.uint8)
+    grid[1::2, 1::2] = free
+    num_of_rows, num_of_columns = grid[1::2, 1::2].shape
+
+    east = np_rng.random((num_of_rows, num_of_columns)) < 0.5
+    east[0, :] = True
+    east[:, -1] = False
+    grid[1::2, 2:width - 1:2][east[:, :-1]] = free
+
+    if num_of_rows > 1:
+      # Flattened rows below the top one, the last column always ends a run
+      ends = ~east[1:].ravel()
+      run_ids = np.cumsum(ends) - ends
+      lengths = np.bincount(run_ids)
+      starts = np.cumsum(lengths) - lengths
+      offsets = (np_rng.random(len(lengths)) * lengths).astype(np.int64)
+      rows, columns = np.divmod(starts + offsets, num_of_columns)
+      grid[2 * rows + 2, 2 * columns + 1] = free
+    return self.make_model(grid, width, height, cell_blocked)
+
+class KruskalMazeGenerator(MazeGenerator):
+  # Randomized Kruskal: walls in random order are opened whenever they separate
+  # two cells that are not connected yet, tracked with a union-find.
+  def generate_maze(self, width: int, height: int, cell_blocked: str, cell_free: str) -> MazeModel:
+    assert width % 2 != 0
+    assert height % 2 != 0
+
+    np_rng = np.random.default_rng(self.rng.getrandbits(64))
+    free = ord(cell_free)
+    grid = np.full((height, width), ord(cell_blocked), dtype=np.uint8)
+    grid[1::2, 1::2] = free
+    num_of_rows, num_of_columns = grid[1::2, 1::2].shape
+
+    # Every inner wall: the two cells it separates and its flat grid index
+    cells = np.arange(num_of_rows * num_of_columns, dtype=np.int32).reshape(num_of_rows, num_of_columns)
+    ys, xs = np.mgrid[1:height:2, 1:width:2]
+    flat = (ys * width + xs).astype(np.int32)
+    a = np.concatenate([cells[:, :-1].ravel(), cells[:-1, :].ravel()])
+    b = np.concatenate([cells[:, 1:].ravel(), cells[1:, :].ravel()])
+    walls = np.concatenate([flat[:, :-1].ravel() + 1, flat[:-1, :].ravel() + width])
+    order = np_rng.permutation(len(walls))
+
+    parent = list(range(num_of_rows * num_of_columns))
+    opened = []
+    # Walls are converted to Python ints in chunks to bound memory
+    for chunk in range(0, len(order), KRUSKAL_CHUNK):
+      chunk_order = order[chunk:chunk + KRUSKAL_CHUNK]
+      for i, j, wall in zip(a[chunk_order].tolist(), b[chunk_order].tolist(), walls[chunk_order].tolist()):
+        while parent[i] != i:
+          parent[i] = parent[parent[i]]
+          i = parent[i]
+        while parent[j] != j:
+          parent[j] = parent[parent[j]]
+          j = parent[j]
+        if i != j:
+          parent[j] = i
+          opened.append(wall)
+    grid.ravel()[opened] = free
+    return self.make_model(grid, width, height, cell_blocked)
+
+GENERATORS = {
+  'dfs': DfsMazeGenerator,
+  'eller': EllerMazeGenerator,
+  'binary_tree': BinaryTreeMazeGenerator,
+  'sidewinder': SidewinderMazeGenerator,
+  'kruskal': KruskalMazeGenerator,
+}
@@ -2,6 +2,8 @@ from scene import Scene, SpriteNode
 import random
 from enum import Enum
 
+import numpy as np
+
 def maze(idx = None):
 	maze_idx = idx if idx != None and idx >= 0 and idx < len(mazes) else random.randint(0, len(mazes) - 1)
 	return Maze(mazes[maze_idx])
@@ -15,6 +17,16 @@ class Direction(Enum):
 CELL_BLOCKED = '#'
 CELL_FREE = ' '
 
+# Bits of PackedMazeModel.neighbor_masks(): open neighbors of an open cell
+OPEN_LEFT = 1
+OPEN_RIGHT = 2
+OPEN_UP = 4
+OPEN_DOWN = 8
+# Number of open neighbors of every mask
+NEIGHBOR_COUNTS = np.array([bin(mask).count('1') for mask in range(16)], dtype=np.uint8)
+# Rows unpacked at once by the bulk queries
+BAND_ROWS = 1024
+
 class MazeModel:
   def __init__(self, map, entrance_coords, exit_coords):
     self.map = map
@@ -40,12 +52,100 @@ class MazeModel:
     return len(self.map)
 
   def as_string(self):
-    str_map = ''
-    str_map += f"entrance: {self.entrance_coords}\n"
-    str_map += f"exit: {self.exit_coords}"
-    for row in self.map:
-      str_map += '\n' + ''.join(row)
-    return str_map
+    lines = [f"entrance: {self.entrance_coords}", f"exit: {self.exit_coords}"]
+    lines.extend(''.join(row) for row in self.map)
+    return '\n'.join(lines)
+
+def pack_grid(grid, width, height, cell_blocked=CELL_BLOCKED):
+  # Flat grid of one character per position -> rows of bits, 1 = blocked.
+  # Rows are padded to whole bytes, most significant bit first.
+  cells = np.frombuffer(grid, dtype=np.uint8).reshape(height, width)
+  return np.packbits(cells == ord(cell_blocked), axis=1)
+
+class PackedRows:
+  # Read-only sequence of the rows of a PackedMazeModel, decoded on access
+  def __init__(self, maze_model):
+    self.maze_model = maze_model
+
+  def __len__(self):
+    return self.maze_model.get_height()
+
+  def __getitem__(self, y):
+    if not 0 <= y < len(self):
+      raise IndexError(y)
+    return self.maze_model.row(y)
+
+class PackedMazeModel(MazeModel):
+  # MazeModel that stores one bit per position (rows of bits from pack_grid())
+  # instead of one string per position. map is a PackedRows, so every
+  # MazeModel method keeps working, and the bulk queries work on bands of
+  # unpacked rows with NumPy.
+  def __init__(self, bits, width, entrance_coords, exit_coords):
+    super().__init__(PackedRows(self), entrance_coords, exit_coords)
+    self.bits = bits
+    self.width = width
+    self.height = bits.shape[0]
+    self.row_bytes = bits.shape[1]
+    self._cells = memoryview(bits.reshape(-1))
+
+  def is_blocked(self, coords):
+    x, y = coords
+    return (self._cells[y * self.row_bytes + (x >> 3)] >> (7 - (x & 7))) & 1 == 1
+
+  def get_width(self):
+    return self.width
+
+  def get_height(self):
+    return self.height
+
+  def row(self, y):
+    bits = np.unpackbits(self.bits[y], count=self.width)
+    return np.where(bits, ord(CELL_BLOCKED), ord(CELL_FREE)).astype(np.uint8).tobytes().decode('ascii')
+
+  def open_rows(self, start, stop):
+    # Open positions of rows start..stop - 1, rows outside the maze are blocked
+    rows = np.zeros((stop - start, self.width), dtype=bool)
+    first, last = max(start, 0), min(stop, self.height)
+    if first < last:
+      rows[first - start:last - start] = np.unpackbits(self.bits[first:last], axis=1, count=self.width) == 0
+    return rows
+
+  def neighbor_masks(self, start=0, stop=None):
+    # OPEN_* bits of the open neighbors of every cell of rows start..stop - 1,
+    # 0 for blocked cells
+    stop = self.height if stop is None else stop
+    rows = self.open_rows(start - 1, stop + 1).astype(np.uint8)
+    cells = rows[1:-1]
+    masks = np.zeros(cells.shape, dtype=np.uint8)
+    masks[:, 1:] |= cells[:, :-1] * OPEN_LEFT
+    masks[:, :-1] |= cells[:, 1:] * OPEN_RIGHT
+    masks |= rows[:-2] * OPEN_UP
+    masks |= rows[2:] * OPEN_DOWN
+    masks *= cells
+    return masks
+
+  def neighbor_counts(self, start=0, stop=None):
+    # Number of open neighbors of every cell, 0 for blocked cells
+    return NEIGHBOR_COUNTS[self.neighbor_masks(start, stop)]
+
+  def cell_statistics(self):
+    # Open cells, dead ends (1 open neighbor, including the entrance and the
+    # exit) and junctions (3 or more), counted band by band
+    open_cells = dead_ends = junctions = 0
+    for start in range(0, self.height, BAND_ROWS):
+      stop = min(start + BAND_ROWS, self.height)
+      is_open = self.open_rows(start, stop)
+      counts = self.neighbor_counts(start, stop)[is_open]
+      open_cells += int(is_open.sum())
+      dead_ends += int((counts == 1).sum())
+      junctions += int((counts >= 3).sum())
+    return {'open_cells': open_cells, 'dead_ends': dead_ends, 'junctions': junctions}
+
+  def release(self):
+    # Drops the references to the bits, so a mapped buffer can be closed
+    self._cells.release()
+    self.bits = None
+    self.map = None
 
 class Maze:
 	image_size = 64
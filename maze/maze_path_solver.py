@@ -0,0 +1,187 @@
+from abc import ABC, abstractmethod
+from array import array
+import heapq
+import time
+
+import numpy as np
+
+from maze_model import MazeModel, PackedMazeModel, pack_grid, BAND_ROWS, CELL_BLOCKED, OPEN_LEFT, OPEN_RIGHT, OPEN_UP, OPEN_DOWN
+
+# Shortest path solvers from the entrance to the exit of a whole MazeModel.
+# Positions are flat indices (y * width + x). The open neighbors of every
+# position come from PackedMazeModel.neighbor_masks(), so there are no bounds
+# checks in the search loops, and parents and distances are flat arrays.
+
+def bfs_solve(maze_model: MazeModel):
+  return BfsSolver().solve(maze_model)
+
+def a_star_solve(maze_model: MazeModel):
+  return AStarSolver().solve(maze_model)
+
+def bidirectional_bfs_solve(maze_model: MazeModel):
+  return BidirectionalBfsSolver().solve(maze_model)
+
+def neighbor_masks(maze_model: MazeModel):
+  # OPEN_* masks of every position in one flat bytearray, filled band by band
+  # so only BAND_ROWS rows of temporaries exist at a time
+  if not isinstance(maze_model, PackedMazeModel):
+    grid = ''.join(''.join(row) for row in maze_model.map).encode('ascii')
+    bits = pack_grid(grid, maze_model.get_width(), maze_model.get_height(), CELL_BLOCKED)
+    maze_model = PackedMazeModel(bits, maze_model.get_width(), maze_model.get_entrance_coords(),
+                                 maze_model.get_exit_coords())
+  width, height = maze_model.get_width(), maze_model.get_height()
+  masks = bytearray(width * height)
+  rows = np.frombuffer(masks, dtype=np.uint8).reshape(height, width)
+  for start in range(0, height, BAND_ROWS):
+    stop = min(start + BAND_ROWS, height)
+    rows[start:stop] = maze_model.neighbor_masks(start, stop)
+  return masks
+
+def mask_offsets(width):
+  # Mask -> flat index offsets of the open neighbors
+  steps = ((OPEN_LEFT, -1), (OPEN_RIGHT, 1), (OPEN_UP, -width), (OPEN_DOWN, width))
+  return [tuple(d for bit, d in steps if mask & bit) for mask in range(16)]
+
+def trace_path(parent, index):
+  # Flat indices from the root of the parent array to index
+  path = [index]
+  while parent[index] != index:
+    index = parent[index]
+    path.append(index)
+  path.reverse()
+  return path
+
+class PathSolver(ABC):
+  def __init__(self):
+    self.nodes_expanded = 0
+    self.elapsed = 0.0
+
+  def solve(self, maze_model: MazeModel):
+    # Shortest path as a list of (x, y) from the entrance to the exit, or None
+    self.nodes_expanded = 0
+    started = time.perf_counter()
+    width = maze_model.get_width()
+    masks = neighbor_masks(maze_model)
+    start_x, start_y = maze_model.get_entrance_coords()
+    goal_x, goal_y = maze_model.get_exit_coords()
+    path = self.search(masks, width, start_y * width + start_x, goal_y * width + goal_x)
+    self.elapsed = time.perf_counter() - started
+    if path is None:
+      return None
+    return [(i % width, i // width) for i in path]
+
+  @abstractmethod
+  def search(self, masks, width, start, goal):
+    # Flat indices of a shortest path from start to goal, or None
+    pass
+
+class BfsSolver(PathSolver):
+  def search(self, masks, width, start, goal):
+    offsets = mask_offsets(width)
+    parent = array('i', [-1]) * len(masks)
+    parent[start] = start
+    frontier = [start]
+    expanded = 0
+    while frontier:
+      next_frontier = []
+      for i in frontier:
+        expanded += 1
+        if i == goal:
+          self.nodes_expanded = expanded
+          return trace_path(parent, goal)
+        for d in offsets[masks[i]]:
+          j = i + d
+          if parent[j] < 0:
+            parent[j] = i
+            next_frontier.append(j)
+      frontier = next_frontier
+    self.nodes_expanded = expanded
+    return None
+
+class AStarSolver(PathSolver):
+  # A* with the Manhattan distance to the exit, ties go to the deeper node
+  def search(self, masks, width, start, goal):
+    offsets = mask_offsets(width)
+    goal_y, goal_x = divmod(goal, width)
+    parent = array('i', [-1]) * len(masks)
+    distance = array('i', [-1]) * len(masks)
+    parent[start] = start
+    distance[start] = 0
+    y, x = divmod(start, width)
+    queue = [(abs(x - goal_x) + abs(y - goal_y), 0, start)]
+    push = heapq.heappush
+    pop = heapq.heappop
+    expanded = 0
+    while queue:
+      _, g, i = pop(queue)
+      g = -g
+      if g != distance[i]:
+        # Reached again on a shorter path since it was queued
+        continue
+      expanded += 1
+      if i == goal:
+        self.nodes_expanded = expanded
+        return trace_path(parent, goal)
+      g += 1
+      for d in offsets[masks[i]]:
+        j = i + d
+        if distance[j] < 0 or g < distance[j]:
+          distance[j] = g
+          parent[j] = i
+          y, x = divmod(j, width)
+          push(queue, (g + abs(x - goal_x) + abs(y - goal_y), -g, j))
+    self.nodes_expanded = expanded
+    return None
+
+class BidirectionalBfsSolver(PathSolver):
+  # Breadth-first from both ends, a whole level of the smaller frontier at a
+  # time. The first level that meets the other side holds a shortest path.
+  def search(self, masks, width, start, goal):
+    offsets = mask_offsets(width)
+    parents = (array('i', [-1]) * len(masks), array('i', [-1]) * len(masks))
+    distances = (array('i', [-1]) * len(masks), array('i', [-1]) * len(masks))
+    frontiers = [[start], [goal]]
+    for side, root in enumerate((start, goal)):
+      parents[side][root] = root
+      distances[side][root] = 0
+    expanded = 0
+    best = None
+    while frontiers[0] and frontiers[1] and best is None:
+      side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+      parent, distance = parents[side], distances[side]
+      other_distance = distances[1 - side]
+      next_frontier = []
+      for i in frontiers[side]:
+        expanded += 1
+        if other_distance[i] >= 0:
+          # Only the two roots when start == goal
+          length = distance[i] + other_distance[i]
+          if best is None or length < best[0]:
+            best = (length, i)
+          continue
+        g = distance[i] + 1
+        for d in offsets[masks[i]]:
+          j = i + d
+          if distance[j] < 0:
+            distance[j] = g
+            parent[j] = i
+            next_frontier.append(j)
+          if other_distance[j] >= 0:
+            length = distance[j] + other_distance[j]
+            if best is None or length < best[0]:
+              best = (length, j)
+      frontiers[side] = next_frontier
+    self.nodes_expanded = expanded
+    if best is None:
+      return None
+    meeting = best[1]
+    path = trace_path(parents[0], meeting)
+    backward = trace_path(parents[1], meeting)
+    backward.reverse()
+    return path + backward[1:]
+
+PATH_SOLVERS = {
+  'bfs': BfsSolver,
+  'a_star': AStarSolver,
+  'bidirectional_bfs': BidirectionalBfsSolver,
+}
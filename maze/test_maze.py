@@ -1,7 +1,36 @@
 import unittest
 from unittest.mock import MagicMock
+from collections import deque
+import os
+import random
+import tempfile
 
-from maze_generator import dfs_generate_maze
+from maze_generator import dfs_generate_maze, create_maze, create_generator, GENERATORS, EllerMazeGenerator
+from maze_file import save_maze, generate_maze_file, MappedMazeModel
+from maze_path_solver import PATH_SOLVERS, bfs_solve
+from maze_model import MazeModel, PackedMazeModel, OPEN_LEFT, OPEN_RIGHT, OPEN_UP, OPEN_DOWN
+
+def reachable_cells(maze_model):
+  # Free cells reachable from the entrance
+  seen = {maze_model.get_entrance_coords()}
+  queue = deque(seen)
+  while queue:
+    x, y = queue.popleft()
+    for nx, ny in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+      if (0 <= nx < maze_model.get_width() and 0 <= ny < maze_model.get_height()
+          and (nx, ny) not in seen and not maze_model.is_blocked((nx, ny))):
+        seen.add((nx, ny))
+        queue.append((nx, ny))
+  return seen
+
+def open_neighbors(maze_model, x, y):
+  return [(nx, ny) for nx, ny in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1))
+          if 0 <= nx < maze_model.get_width() and 0 <= ny < maze_model.get_height()
+          and not maze_model.is_blocked((nx, ny))]
+
+def free_cells(maze_model):
+  return {(x, y) for y in range(maze_model.get_height()) for x in range(maze_model.get_width())
+          if not maze_model.is_blocked((x, y))}
 
 class MazeTestCase(unittest.TestCase):
   def test_generate_model(self):
@@ -9,5 +38,210 @@ class MazeTestCase(unittest.TestCase):
     
     print(maze_model.as_string())
 
+  def test_generate_model_is_reproducible(self):
+    maze_model = dfs_generate_maze(31, 21, random.Random(7))
+    same_maze_model = dfs_generate_maze(31, 21, random.Random(7))
+
+    self.assertEqual(maze_model.as_string(), same_maze_model.as_string())
+
+  def test_generate_model_is_perfect(self):
+    maze_model = dfs_generate_maze(31, 21, random.Random(3))
+    cells = 15 * 10
+
+    # Spanning tree of the cells: cells - 1 passages, plus entrance and exit
+    self.assertEqual(len(free_cells(maze_model)), 2 * cells - 1 + 2)
+    self.assertEqual(reachable_cells(maze_model), free_cells(maze_model))
+    self.assertIn(maze_model.get_exit_coords(), reachable_cells(maze_model))
+
+  def test_generate_large_model(self):
+    # Deeper than the recursion limit
+    maze_model = dfs_generate_maze(1001, 1001, random.Random(1))
+
+    self.assertEqual(maze_model.get_width(), 1001)
+    self.assertEqual(maze_model.get_height(), 1001)
+    self.assertEqual(maze_model.cell_statistics()['open_cells'], 2 * 500 * 500 - 1 + 2)
+
+  def test_generators_are_perfect(self):
+    for algorithm in GENERATORS:
+      for width, height in ((3, 3), (3, 11), (11, 3), (31, 21)):
+        with self.subTest(algorithm=algorithm, width=width, height=height):
+          maze_model = create_maze(width, height, algorithm, random.Random(5))
+          cells = (width // 2) * (height // 2)
+
+          self.assertEqual(maze_model.get_width(), width)
+          self.assertEqual(maze_model.get_height(), height)
+          self.assertEqual(len(free_cells(maze_model)), 2 * cells - 1 + 2)
+          self.assertEqual(reachable_cells(maze_model), free_cells(maze_model))
+
+  def test_generators_are_reproducible(self):
+    for algorithm in GENERATORS:
+      with self.subTest(algorithm=algorithm):
+        maze_model = create_maze(41, 31, algorithm, random.Random(11))
+        same_maze_model = create_maze(41, 31, algorithm, random.Random(11))
+
+        self.assertEqual(maze_model.as_string(), same_maze_model.as_string())
+
+  def test_create_unknown_generator(self):
+    with self.assertRaises(Exception):
+      create_generator('prim')
+
+  def test_eller_rows(self):
+    rows = list(EllerMazeGenerator(random.Random(1)).rows(21, 11, '#', ' '))
+
+    self.assertEqual(len(rows), 11)
+    self.assertTrue(all(len(row) == 21 for row in rows))
+    self.assertEqual(rows[0], b'#' * 21)
+    self.assertEqual(rows[-1], b'#' * 21)
+
+class PackedMazeModelTestCase(unittest.TestCase):
+  def setUp(self):
+    self.maze_model = create_maze(37, 23, 'dfs', random.Random(4))
+    # The same maze as rows of one character strings
+    self.list_model = MazeModel([list(row) for row in self.maze_model.map],
+                                self.maze_model.get_entrance_coords(), self.maze_model.get_exit_coords())
+
+  def test_same_api_as_list_model(self):
+    self.assertIsInstance(self.maze_model, PackedMazeModel)
+    self.assertEqual(self.maze_model.get_width(), self.list_model.get_width())
+    self.assertEqual(self.maze_model.get_height(), self.list_model.get_height())
+    self.assertEqual(self.maze_model.as_string(), self.list_model.as_string())
+    for y in range(23):
+      for x in range(37):
+        self.assertEqual(self.maze_model.is_blocked((x, y)), self.list_model.is_blocked((x, y)))
+    self.assertTrue(self.maze_model.is_exit(self.list_model.get_exit_coords()))
+
+  def test_one_bit_per_cell(self):
+    self.assertEqual(self.maze_model.bits.nbytes, 23 * 5)
+
+  def test_neighbor_masks(self):
+    masks = self.maze_model.neighbor_masks()
+
+    self.assertEqual(masks.shape, (23, 37))
+    for y in range(23):
+      for x in range(37):
+        expected = 0
+        if not self.list_model.is_blocked((x, y)):
+          for (nx, ny), bit in zip(((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)),
+                                   (OPEN_LEFT, OPEN_RIGHT, OPEN_UP, OPEN_DOWN)):
+            if (nx, ny) in open_neighbors(self.list_model, x, y):
+              expected |= bit
+        self.assertEqual(masks[y, x], expected)
+
+  def test_neighbor_masks_of_rows(self):
+    masks = self.maze_model.neighbor_masks()
+
+    self.assertTrue((self.maze_model.neighbor_masks(5, 9) == masks[5:9]).all())
+
+  def test_cell_statistics(self):
+    counts = [len(open_neighbors(self.list_model, x, y)) for x, y in free_cells(self.list_model)]
+
+    self.assertEqual(self.maze_model.cell_statistics(), {
+      'open_cells': len(counts),
+      'dead_ends': counts.count(1),
+      'junctions': sum(1 for c in counts if c >= 3),
+    })
+
+class PathSolverTestCase(unittest.TestCase):
+  def assertValidPath(self, maze_model, path):
+    self.assertEqual(path[0], maze_model.get_entrance_coords())
+    self.assertEqual(path[-1], maze_model.get_exit_coords())
+    for (x, y), (nx, ny) in zip(path, path[1:]):
+      self.assertEqual(abs(x - nx) + abs(y - ny), 1)
+      self.assertFalse(maze_model.is_blocked((nx, ny)))
+
+  def test_solvers_find_the_same_shortest_path(self):
+    for algorithm in GENERATORS:
+      maze_model = create_maze(41, 31, algorithm, random.Random(6))
+      lengths = set()
+      for name, solver_class in PATH_SOLVERS.items():
+        with self.subTest(algorithm=algorithm, solver=name):
+          solver = solver_class()
+          path = solver.solve(maze_model)
+
+          self.assertValidPath(maze_model, path)
+          self.assertGreater(solver.nodes_expanded, 0)
+          lengths.add(len(path))
+      self.assertEqual(len(lengths), 1)
+
+  def test_solvers_on_maze_with_loops(self):
+    # Two open rooms joined at (5, 4), many shortest paths of 16 steps
+    rows = ['#' + ' ' + '#' * 9] + ['#' + ' ' * 9 + '#' for _ in range(7)] + ['#' * 9 + ' ' + '#']
+    rows[4] = '#' * 5 + ' ' + '#' * 5
+    maze_model = MazeModel(rows, (1, 0), (9, 8))
+
+    for name, solver_class in PATH_SOLVERS.items():
+      with self.subTest(solver=name):
+        path = solver_class().solve(maze_model)
+
+        self.assertValidPath(maze_model, path)
+        self.assertEqual(len(path), 16 + 1)
+
+  def test_solvers_without_path(self):
+    rows = ['# #', '###', '# #']
+    maze_model = MazeModel(rows, (1, 0), (1, 2))
+
+    for name, solver_class in PATH_SOLVERS.items():
+      with self.subTest(solver=name):
+        self.assertIsNone(solver_class().solve(maze_model))
+
+  def test_solve_mapped_maze(self):
+    with tempfile.TemporaryDirectory() as directory:
+      path = os.path.join(directory, 'maze.bin')
+      generate_maze_file(path, 101, 81, random.Random(3))
+
+      with MappedMazeModel(path) as mapped_model:
+        self.assertValidPath(mapped_model, bfs_solve(mapped_model))
+
+class MazeFileTestCase(unittest.TestCase):
+  def setUp(self):
+    self.directory = tempfile.TemporaryDirectory()
+    self.path = os.path.join(self.directory.name, 'maze.bin')
+
+  def tearDown(self):
+    self.directory.cleanup()
+
+  def test_save_and_map_maze(self):
+    # Width not a multiple of 8, so rows are padded
+    maze_model = create_maze(37, 21, 'kruskal', random.Random(1))
+    save_maze(self.path, maze_model)
+
+    with MappedMazeModel(self.path) as mapped_model:
+      self.assertEqual(os.path.getsize(self.path), 28 + 21 * 5)
+      self.assertEqual(mapped_model.get_width(), 37)
+      self.assertEqual(mapped_model.get_height(), 21)
+      self.assertEqual(mapped_model.get_entrance_coords(), maze_model.get_entrance_coords())
+      self.assertEqual(mapped_model.get_exit_coords(), maze_model.get_exit_coords())
+      self.assertEqual(mapped_model.as_string(), maze_model.as_string())
+      for y in range(21):
+        for x in range(37):
+          self.assertEqual(mapped_model.is_blocked((x, y)), maze_model.is_blocked((x, y)))
+
+  def test_save_list_model(self):
+    maze_model = create_maze(21, 11, 'eller', random.Random(1))
+    list_model = MazeModel([list(row) for row in maze_model.map],
+                           maze_model.get_entrance_coords(), maze_model.get_exit_coords())
+    save_maze(self.path, list_model)
+
+    with MappedMazeModel(self.path) as mapped_model:
+      self.assertEqual(mapped_model.as_string(), maze_model.as_string())
+      self.assertEqual(mapped_model.cell_statistics(), maze_model.cell_statistics())
+
+  def test_generate_maze_file(self):
+    generate_maze_file(self.path, 41, 31, random.Random(2))
+
+    with MappedMazeModel(self.path) as mapped_model:
+      cells = 20 * 15
+      self.assertFalse(mapped_model.is_blocked(mapped_model.get_entrance_coords()))
+      self.assertFalse(mapped_model.is_blocked(mapped_model.get_exit_coords()))
+      self.assertEqual(len(free_cells(mapped_model)), 2 * cells - 1 + 2)
+      self.assertEqual(reachable_cells(mapped_model), free_cells(mapped_model))
+
+  def test_map_invalid_file(self):
+    with open(self.path, 'wb') as f:
+      f.write(b'not a maze file at all, just some text')
+
+    with self.assertRaises(Exception):
+      MappedMazeModel(self.path)
+
 if __name__ == '__main__':
     unittest.main()
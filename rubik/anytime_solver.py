@@ -0,0 +1,68 @@
+# ---------- Anytime solver ----------
+# Runs an optimal solver within a time and node budget. When the budget runs
+# out first, or the solver gives up and returns None, the cube is solved by a
+# fast suboptimal fallback instead, so solve() always returns within roughly
+# timeout plus the fallback's time. stats.optimal tells which kind of answer
+# was returned. Cancelling the token stops the search without a fallback
+# (SearchCancelled is raised). When the fallback has no answer either, e.g.
+# because the two-phase tables were never built, the table-free beginner's
+# method solves the cube.
+
+import logging
+
+from cube_model import CubeModel
+from ida_star_solver import IdaStarSolver
+from two_phase_solver import TwoPhaseSolver, TablesNotFound
+from beginner_solver import BeginnerSolver
+from solver import Solver, SolveStats, SearchBudget, SearchCancelled, CancellationToken
+
+class AnytimeSolver(Solver):
+    def __init__(self, solver: Solver = None, fallback: Solver = None, timeout=1.0, max_nodes=None):
+        self.solver = solver if solver is not None else IdaStarSolver()
+        self.fallback = fallback if fallback is not None else TwoPhaseSolver()
+        self.last_resort = BeginnerSolver()
+        self.timeout = timeout
+        self.max_nodes = max_nodes
+        # Token of the running solve() call, cancel() it from another thread
+        self.token = CancellationToken()
+        # Solver running right now, its stats show the search progress
+        self.current = self.solver
+        # True when the last answer came from the fallback
+        self.fell_back = False
+        self.stats = SolveStats()
+
+    def solve(self, cube: CubeModel, budget: SearchBudget = None) -> list:
+        if budget is None:
+            self.token = CancellationToken()
+            budget = SearchBudget(self.timeout, self.max_nodes, self.token)
+        self.fell_back = False
+        self.current = self.solver
+        try:
+            solution = self.solver.solve(cube, budget)
+            self.stats = self.solver.stats
+        except SearchCancelled:
+            if budget.cancelled():
+                self.stats = self.solver.stats
+                raise
+            solution = None
+        if solution is None:
+            # Budget or depth limit ran out before a solution was found
+            self.fell_back = True
+            solution = self._fall_back(self.fallback, cube, budget)
+            if solution is None:
+                solution = self._fall_back(self.last_resort, cube, budget)
+        return solution
+
+    def _fall_back(self, solver, cube, budget):
+        self.current = solver
+        try:
+            solution = solver.solve(cube, SearchBudget(token=budget.token))
+        except TablesNotFound as e:
+            logging.warning('Fallback %s unavailable: %s', type(solver).__name__, e)
+            return None
+        self.stats = solver.stats
+        self.stats.optimal = False
+        return solution
+
+    def cancel(self):
+        self.token.cancel()
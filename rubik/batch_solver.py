@@ -0,0 +1,119 @@
+# ---------- Batch solving ----------
+# Solves many cube states (CubeModel.as_string() format, one per line) on a
+# process pool and streams one JSON record per state, in input order. Heuristic
+# tables are read-only: pattern databases are mmapped by every worker, so the
+# pages are shared instead of copied.
+#
+# Run: python batch_solver.py [states.txt] [--solver two_phase] [--workers N] > solutions.jsonl
+
+from math import ceil
+import argparse
+import json
+import logging
+import multiprocessing
+import sys
+import time
+
+from cube_model import CubeModel
+from ida_star_solver import IdaStarSolver
+from two_phase_solver import TwoPhaseSolver
+from bidirectional_solver import BidirectionalSolver
+from beginner_solver import BeginnerSolver
+
+SOLVERS = {
+    'ida_star': IdaStarSolver,
+    'two_phase': TwoPhaseSolver,
+    'bidirectional': BidirectionalSolver,
+    'beginner': BeginnerSolver,
+}
+
+_worker_solver = None
+
+def _init_worker(solver):
+    global _worker_solver
+    _worker_solver = solver
+
+def _solve_state(state):
+    started = time.perf_counter()
+    try:
+        solution = _worker_solver.solve(CubeModel.from_string(state))
+    except Exception as e:
+        return {'state': state, 'error': str(e), 'seconds': time.perf_counter() - started}
+    stats = _worker_solver.stats
+    return {
+        'state': state,
+        'solution': solution,
+        'length': None if solution is None else len(solution),
+        'nodes': stats.nodes,
+        'expanded': stats.expanded,
+        'seconds': time.perf_counter() - started,
+    }
+
+def solve_batch(states, solver=None, workers=None, chunksize=4):
+    # Yields one record per state, in input order
+    solver = solver if solver is not None else IdaStarSolver()
+    states = (s.strip() for s in states)
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(solver,)) as pool:
+        yield from pool.imap(_solve_state, (s for s in states if s), chunksize)
+
+def percentile(sorted_values, p):
+    # Nearest-rank percentile of an already sorted list
+    if not sorted_values:
+        return 0.0
+    rank = max(1, ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+class BatchSummary:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.latencies = []
+        self.failed = 0
+
+    def add(self, record):
+        self.latencies.append(record['seconds'])
+        if 'error' in record or record['solution'] is None:
+            self.failed += 1
+
+    def as_dict(self):
+        elapsed = time.perf_counter() - self.started
+        latencies = sorted(self.latencies)
+        return {
+            'cubes': len(latencies),
+            'failed': self.failed,
+            'seconds': elapsed,
+            'cubes_per_second': len(latencies) / elapsed if elapsed > 0 else 0.0,
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+        }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Solve cube states in batch.')
+    parser.add_argument('input', nargs='?', help='file with one state per line (default: stdin)')
+    parser.add_argument('--solver', choices=sorted(SOLVERS), default='ida_star')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output', help='JSON lines output file (default: stdout)')
+    args = parser.parse_args(argv)
+
+    source = open(args.input) if args.input else sys.stdin
+    target = open(args.output, 'w') if args.output else sys.stdout
+    summary = BatchSummary()
+    try:
+        for record in solve_batch(source, SOLVERS[args.solver](), args.workers):
+            summary.add(record)
+            target.write(json.dumps(record) + '\n')
+            target.flush()
+    finally:
+        if args.input:
+            source.close()
+        if args.output:
+            target.close()
+    result = summary.as_dict()
+    logging.info('Solved %d cubes (%d failed) in %.2fs: %.2f cubes/s, p50 %.3fs, p95 %.3fs, p99 %.3fs',
+                 result['cubes'], result['failed'], result['seconds'], result['cubes_per_second'],
+                 result['p50'], result['p95'], result['p99'])
+    return result
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
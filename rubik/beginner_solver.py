@@ -1,43 +1,209 @@
-from cube_model import CubeModel
-from solver import Solver
+from collections import deque
 import logging
+import time
 
-# TODO: Implement beginner solver phases.
-#       Maybe IDA* solver could be used to find the solution to the specific phases.
+from cube_model import CubeModel, MOVE_PERMUTATIONS, INVERSE_MOVES
+from solver import Solver, SolveStats, SearchBudget
+from move_optimizer import optimize_moves
+from pattern_database import Pattern, CORNERS, EDGES, pattern_depths
+
+# Layer by layer with the white (U) face first, so the yellow (D) layer is solved last.
+# Every phase is a small search restricted to its own goal:
+#   - cross: greedy descent on an exact distance table of the 4 U edges,
+#   - corners and second layer: a breadth-first search over the placements of
+#     one cubie, using macros that keep the already solved cubies in place,
+#   - OLL and PLL: lookup tables indexed by a last-layer signature.
+# Solutions are longer than IDA*'s but every phase takes about a millisecond.
+
+D_TURNS = [['D'], ["D'"], ['D2']]
+
+# Corner slot (URF, UFL, ULB, UBR) -> moves the slot's corner down and back up
+CORNER_TRIGGERS = {
+    0: "R' D' R D".split(),
+    1: "F' D' F D".split(),
+    2: "L' D' L D".split(),
+    3: "B' D' B D".split(),
+}
+# Middle edge slot (FR, FL, BL, BR) -> the two insertions from the D layer
+EDGE_INSERTIONS = {
+    8: ["D F D' F' D' R' D R".split(), "D' R' D R D F D' F'".split()],
+    9: ["D' F' D F D L D' L'".split(), "D L D' L' D' F' D F".split()],
+    10: ["D B D' B' D' L' D L".split(), "D' L' D L D B D' B'".split()],
+    11: ["D' B' D B D R D' R'".split(), "D R D' R' D' B' D B".split()],
+}
+# Last layer algorithms (x2 of the usual U layer versions), they keep both solved layers
+OLL_ALGORITHMS = [
+    "B R D R' D' B'".split(),      # flips two edges
+    "R D R' D R D2 R'".split(),    # Sune, twists three corners
+]
+PLL_ALGORITHMS = [
+    "R D R' D' R' B R2 D' R' D' R D R' B'".split(),  # T: swaps two corners and two edges
+    "R D' R D R D R D' R' D' R2".split(),            # U: cycles three edges
+    "R' B R' F2 R B' R' F2 R2".split(),              # A: cycles three corners
+]
+
+# D layer facelets: D face and the bottom rows of R, F, L, B
+LAST_LAYER_FACELETS = list(range(27, 36)) + [15, 16, 17, 24, 25, 26, 42, 43, 44, 51, 52, 53]
+LAST_LAYER_SIDE_FACELETS = LAST_LAYER_FACELETS[9:]
+# Blanks every sticker but the yellow ones
+_YELLOW_MASK = bytes.maketrans(b'URFLB', b'.....')
+
+_tables = {}
+
+def invert(seq):
+    return [INVERSE_MOVES[m] for m in reversed(seq)]
+
+def oll_signature(state):
+    # Which last layer stickers show yellow
+    return bytes(state[f] for f in LAST_LAYER_FACELETS).translate(_YELLOW_MASK)
+
+def pll_signature(state):
+    return bytes(state[f] for f in LAST_LAYER_SIDE_FACELETS)
+
+def last_layer_table(macros, signature, mask=None):
+    # Breadth-first search over macro sequences from the solved cube. Every
+    # reached case maps to the inverted sequence, which solves it.
+    start = CubeModel()
+    if mask:
+        start.state = start.state.translate(mask)
+    table = {signature(start.state): []}
+    queue = deque([(start.state, [])])
+    cube = CubeModel()
+    while queue:
+        state, seq = queue.popleft()
+        for macro in macros:
+            cube.state = state
+            cube.apply(macro)
+            key = signature(cube.state)
+            if key not in table:
+                table[key] = invert(seq + macro)
+                queue.append((cube.state, seq + macro))
+    return table
+
+def load_tables():
+    if not _tables:
+        cross = Pattern('cross', EDGES, range(4))
+        _tables['cross'] = (cross, pattern_depths(cross))
+        _tables['oll'] = last_layer_table(D_TURNS + OLL_ALGORITHMS, oll_signature, _YELLOW_MASK)
+        _tables['pll'] = last_layer_table(D_TURNS + PLL_ALGORITHMS, pll_signature)
+    return _tables
+
+def macro_code_moves(cubie_set, macro):
+    # Placement code -> placement code after the whole macro
+    codes = list(range(cubie_set.num_of_slots * cubie_set.num_of_orientations))
+    for m in macro:
+        code_move = cubie_set.code_moves[m]
+        codes = [int(code_move[c]) for c in codes]
+    return codes
 
 class BeginnerSolver(Solver):
-    def solve(self, cube: CubeModel) -> list:
+    def __init__(self):
+        self.stats = SolveStats()
+        # (phase, number of moves, seconds) of the last solve() call
+        self.phase_stats = []
+
+    def solve(self, cube: CubeModel, budget: SearchBudget = None) -> list:
+        # Takes milliseconds, so the budget is not polled
+        self.stats = SolveStats()
+        self.phase_stats = []
+        started = time.perf_counter()
+        cube = cube.clone()
         seq = []
-        seq += self.solve_white_cross(cube)
-        seq += self._solve_white_corners(cube)
-        seq += self._solve_second_layer(cube)
-        seq += self._solve_oll(cube)
-        seq += self._solve_pll(cube)
+        seq += self._timed('white cross', self.solve_white_cross, cube)
+        seq += self._timed('white corners', self._solve_white_corners, cube)
+        seq += self._timed('second layer', self._solve_second_layer, cube)
+        seq += self._timed('oll', self._solve_oll, cube)
+        seq += self._timed('pll', self._solve_pll, cube)
+        # Moves at the phase boundaries often cancel
+        seq = optimize_moves(seq)
+        self.stats.elapsed = time.perf_counter() - started
+        return seq
+
+    def _timed(self, phase, solve_phase, cube):
+        started = time.perf_counter()
+        seq = optimize_moves(solve_phase(cube))
+        cube.apply(seq)
+        self.phase_stats.append((phase, len(seq), time.perf_counter() - started))
         return seq
 
     # --- PHASE 1: White Cross ---
     def solve_white_cross(self, cube):
         logging.info('Solve white-cross on cube: %s', cube.as_string())
+        pattern, depths = load_tables()['cross']
+        current = cube.clone()
         seq = []
+        distance = depths[pattern.index(current.state)]
+        while distance:
+            self.stats.nodes += 1
+            self.stats.expanded += 1
+            state = current.state
+            for m in MOVE_PERMUTATIONS:
+                self.stats.generated += 1
+                current.move(m)
+                if depths[pattern.index(current.state)] < distance:
+                    break
+                current.state = state
+            seq.append(m)
+            distance -= 1
         logging.info('Solution (white-cross) cube: "%s"; moves: %s', cube.as_string(), seq)
         return seq
 
     # --- PHASE 2: White Corners ---
     def _solve_white_corners(self, cube):
-        seq = []
-        return seq
+        return self._solve_cubies(cube, CORNERS, CORNER_TRIGGERS, lambda slot: [CORNER_TRIGGERS[slot]])
 
     # --- PHASE 3: Second Layer Edges ---
     def _solve_second_layer(self, cube):
+        return self._solve_cubies(cube, EDGES, EDGE_INSERTIONS, lambda slot: EDGE_INSERTIONS[slot])
+
+    def _solve_cubies(self, cube, cubie_set, slots, slot_macros):
+        # Solves the cubies of the given slots one by one. Only macros of slots
+        # that are still unsolved may be used, so solved cubies stay in place.
+        o = cubie_set.num_of_orientations
+        current = cube.clone()
         seq = []
+        for cubie in slots:
+            placements = cubie_set.placements(current.state)
+            unsolved = {s for s in slots if placements[s] != (s, 0)}
+            if cubie not in unsolved:
+                continue
+            macros = D_TURNS + [macro for slot in sorted(unsolved) for macro in slot_macros(slot)]
+            slot, twist = placements[cubie]
+            path = self._bfs(cubie_set, macros, slot * o + twist, cubie * o)
+            current.apply(path)
+            seq += path
         return seq
 
+    def _bfs(self, cubie_set, macros, start, goal):
+        code_moves = [macro_code_moves(cubie_set, macro) for macro in macros]
+        parents = {start: None}
+        queue = deque([start])
+        while queue:
+            code = queue.popleft()
+            self.stats.nodes += 1
+            if code == goal:
+                break
+            self.stats.expanded += 1
+            for i, codes in enumerate(code_moves):
+                self.stats.generated += 1
+                child = codes[code]
+                if child not in parents:
+                    parents[child] = (code, i)
+                    queue.append(child)
+        else:
+            raise Exception('Cubie cannot be solved with the allowed macros.')
+        path = []
+        while parents[code] is not None:
+            code, i = parents[code]
+            path[:0] = macros[i]
+        return path
+
     # --- PHASE 4: OLL (Orient Last Layer) ---
     def _solve_oll(self, cube):
-        seq = []
-        return seq
+        self.stats.nodes += 1
+        return list(load_tables()['oll'][oll_signature(cube.state)])
 
     # --- PHASE 5: PLL (Permute Last Layer) ---
     def _solve_pll(self, cube):
-        seq = []
-        return seq
+        self.stats.nodes += 1
+        return list(load_tables()['pll'][pll_signature(cube.state)])
@@ -0,0 +1,246 @@
+# Micro-benchmarks for the Rubik's Cube model and solvers.
+# Run: python benchmarks.py [name ...]
+
+from operator import itemgetter
+import random
+import sys
+import timeit
+
+from cube_model import CubeModel, QUARTER_TURNS
+from ida_star_solver import IdaStarSolver, MOVES
+from two_phase_solver import TwoPhaseSolver, load_tables
+from transposition_table import TranspositionTable
+from solver import SearchBudget, SearchCancelled
+from parallel_ida_star_solver import ParallelIdaStarSolver
+from bidirectional_solver import BidirectionalSolver
+from cube_batch import CubeBatch, MOVE_TOKENS
+from beginner_solver import BeginnerSolver, load_tables as load_beginner_tables
+
+def bench_moves(number=100000):
+    # Per-move cost of all 18 tokens: repeated quarter turns vs. one composed permutation
+    quarter_getters = {face: itemgetter(*perm) for face, perm in QUARTER_TURNS.items()}
+    cube = CubeModel.from_moves(["R", "U", "F"])
+    print(f"{'move':<6}{'quarter turns (us)':>20}{'composed (us)':>16}")
+    for token in MOVES:
+        getter = quarter_getters[token[0]]
+        turns = 3 if token.endswith("'") else 2 if token.endswith('2') else 1
+
+        def quarter_turns():
+            state = cube.state
+            for _ in range(turns):
+                state = bytes(getter(state))
+            cube.state = state
+
+        before = timeit.timeit(quarter_turns, number=number) / number * 1e6
+        after = timeit.timeit(lambda: cube.move(token), number=number) / number * 1e6
+        print(f'{token:<6}{before:>20.3f}{after:>16.3f}')
+
+def bench_batch_moves(num_of_cubes=10000, num_of_moves=20, seed=1):
+    # States x moves per second: loop over CubeModel.move vs. one CubeBatch gather per move
+    rng = random.Random(seed)
+    scramble = [rng.choice(MOVE_TOKENS) for _ in range(num_of_moves)]
+    cube_models = [CubeModel() for _ in range(num_of_cubes)]
+
+    def model_loop():
+        for cube_model in cube_models:
+            for m in scramble:
+                cube_model.move(m)
+
+    def batch_moves():
+        for m in scramble:
+            batch.move(m)
+
+    batch = CubeBatch.solved(num_of_cubes)
+    work = num_of_cubes * num_of_moves
+    model = work / min(timeit.repeat(model_loop, number=1, repeat=3))
+    batched = work / min(timeit.repeat(batch_moves, number=1, repeat=3))
+    same = batch.equals(CubeBatch.from_models(cube_models)).all()
+    print(f'cubes: {num_of_cubes}, moves: {num_of_moves}, same states: {same}')
+    print(f"{'CubeModel.move (moves/s)':<28}{model:>14.0f}")
+    print(f"{'CubeBatch.move (moves/s)':<28}{batched:>14.0f}")
+
+def _view_cube():
+    # The view needs Pythonista's ui module, mocked here as in test_rubiks_cube.py
+    from unittest.mock import MagicMock
+    import logging
+    sys.modules.setdefault('ui', MagicMock())
+    from cube_view import Cube
+    logging.disable(logging.INFO)
+    return Cube()
+
+def bench_faces_to_draw(number=1000):
+    cube = _view_cube()
+    cube.rotate_cube('y', 3.75)
+    cube.rotate_cube('x', -0.44)
+    offset = (200, 300)
+    at_rest = timeit.timeit(lambda: cube.faces_to_draw(offset), number=number) / number
+    faces = len(cube.faces_to_draw(offset))
+    cube.play_moves(["R"])
+    cube.update()
+    turning = timeit.timeit(lambda: cube.faces_to_draw(offset), number=number) / number
+    print(f"{'cube':<10}{'faces':>7}{'ms/frame':>10}")
+    print(f"{'at rest':<10}{faces:>7}{at_rest * 1e3:>10.3f}")
+    print(f"{'turning':<10}{len(cube.faces_to_draw(offset)):>7}{turning * 1e3:>10.3f}")
+
+def bench_update(seed=1):
+    # Cube.update() per animation frame while playing back a long beginner solution
+    cube = _view_cube()
+    cube.rotate_cube('y', 3.75)
+    cube.rotate_cube('x', -0.44)
+    rng = random.Random(seed)
+    scramble = CubeModel.from_moves([rng.choice(MOVES) for _ in range(30)])
+    solution = BeginnerSolver().solve(scramble)
+    cube.logic = scramble
+    cube.play_moves(solution)
+    frames = 0
+    started = timeit.default_timer()
+    while True:
+        frames += 1
+        current_move, moves_left = cube.update()
+        if current_move is None and moves_left == 0:
+            break
+    elapsed = timeit.default_timer() - started
+    print(f'moves: {len(solution)}, frames: {frames}, solved: {cube.logic.is_solved()}')
+    print(f'update() ms/frame: {elapsed / frames * 1e3:.4f}')
+
+# Scrambles used by test_rubiks_cube.py
+SCRAMBLES = [
+    ["U"],
+    ["R", "U", "F"],
+    ["U", "D", "F", "B", "L", "R"],
+    ["U'", "D'", "F'", "B'", "L'", "R'"],
+    ["U'", "D", "F'", "B'", "L", "R'"],
+]
+
+def bench_ida_star():
+    solver = IdaStarSolver()
+    print(f"{'scramble':<36}{'length':>8}{'nodes':>10}{'seconds':>10}{'nodes/s':>12}")
+    for scramble in SCRAMBLES:
+        solution = solver.solve(CubeModel.from_moves(scramble))
+        stats = solver.stats
+        print(f"{' '.join(scramble):<36}{len(solution):>8}{stats.nodes:>10}"
+              f"{stats.elapsed:>10.3f}{stats.nodes_per_second():>12.0f}")
+
+def bench_branching():
+    solvers = [('same face', IdaStarSolver(canonical_moves=False)), ('canonical', IdaStarSolver())]
+    print(f"{'scramble':<36}{'successors':<12}{'nodes':>10}{'seconds':>10}{'branching':>11}")
+    for scramble in SCRAMBLES[2:]:
+        for name, solver in solvers:
+            solver.solve(CubeModel.from_moves(scramble))
+            stats = solver.stats
+            print(f"{' '.join(scramble):<36}{name:<12}{stats.nodes:>10}{stats.elapsed:>10.3f}"
+                  f"{stats.branching_factor():>11.2f}")
+
+def bench_transposition_table(max_bytes=16 * 1024 * 1024, max_retries=20):
+    plain = IdaStarSolver()
+    table = TranspositionTable(max_bytes)
+    with_table = IdaStarSolver(transposition_table=table)
+    print(f"{'scramble':<36}{'nodes':>10}{'nodes (TT)':>12}{'seconds':>10}{'seconds (TT)':>14}{'hit rate':>10}")
+    for scramble in SCRAMBLES:
+        plain.solve(CubeModel.from_moves(scramble))
+        table.reset_stats()
+        with_table.solve(CubeModel.from_moves(scramble))
+        print(f"{' '.join(scramble):<36}{plain.stats.nodes:>10}{with_table.stats.nodes:>12}"
+              f"{plain.stats.elapsed:>10.3f}{with_table.stats.elapsed:>14.3f}{table.hit_rate():>10.2%}")
+    print(f'table entries: {table.size}, stores: {table.stores}, evictions: {table.evictions}')
+    # Where the table pays off: a solve cut short by its budget and retried.
+    # Bounds of finished subtrees survive the cancellation, so every retry
+    # goes on from there instead of starting over.
+    print(f"{'scramble':<36}{'node budget':>12}{'retries':>9}{'retries (TT)':>14}{'nodes (TT)':>12}")
+    for scramble in SCRAMBLES[2:]:
+        cube = CubeModel.from_moves(scramble)
+        plain.solve(cube)
+        max_nodes = plain.stats.nodes // 4
+        retries = []
+        for solver in (plain, IdaStarSolver(transposition_table=TranspositionTable(max_bytes))):
+            nodes = 0
+            for attempt in range(max_retries + 1):
+                try:
+                    solver.solve(cube, SearchBudget(max_nodes=max_nodes))
+                except SearchCancelled:
+                    nodes += solver.stats.nodes
+                    continue
+                nodes += solver.stats.nodes
+                retries.append(str(attempt))
+                break
+            else:
+                retries.append(f'>{max_retries}')
+        print(f"{' '.join(scramble):<36}{max_nodes:>12}{retries[0]:>9}{retries[1]:>14}{nodes:>12}")
+
+def bench_parallel(workers=None):
+    serial = IdaStarSolver()
+    parallel = ParallelIdaStarSolver(workers=workers)
+    print(f'workers: {parallel.workers}')
+    print(f"{'scramble':<36}{'seconds':>10}{'seconds (parallel)':>20}{'same path':>11}")
+    for scramble in SCRAMBLES + [["R", "U", "F", "L", "D", "B", "R", "U"]]:
+        cube = CubeModel.from_moves(scramble)
+        same = serial.solve(cube) == parallel.solve(cube)
+        print(f"{' '.join(scramble):<36}{serial.stats.elapsed:>10.3f}{parallel.stats.elapsed:>20.3f}{str(same):>11}")
+
+def bench_two_phase(num_of_cubes=50, seed=1):
+    load_tables()
+    solver = TwoPhaseSolver()
+    rng = random.Random(seed)
+    times = []
+    lengths = []
+    for _ in range(num_of_cubes):
+        cube = CubeModel.from_moves([rng.choice(MOVES) for _ in range(30)])
+        lengths.append(len(solver.solve(cube)))
+        times.append(solver.stats.elapsed)
+    times.sort()
+    print(f'cubes: {num_of_cubes}, mean length: {sum(lengths) / num_of_cubes:.2f}, max length: {max(lengths)}')
+    print(f'seconds mean: {sum(times) / num_of_cubes:.3f}, median: {times[num_of_cubes // 2]:.3f}, max: {times[-1]:.3f}')
+
+def bench_bidirectional(max_bytes=64 * 1024 * 1024):
+    unidirectional = IdaStarSolver()
+    solver = BidirectionalSolver(max_bytes=max_bytes)
+    started = timeit.default_timer()
+    solver.build_frontier()
+    print(f'frontier depth: {solver.backward_depth}, states: {solver.frontier_size}, '
+          f'table: {len(solver.frontier) * solver.frontier.itemsize / 2 ** 20:.1f} MB, '
+          f'built in {timeit.default_timer() - started:.3f}s')
+    print(f"{'scramble':<36}{'nodes':>10}{'nodes (bidi)':>14}{'seconds':>10}{'seconds (bidi)':>16}")
+    for scramble in SCRAMBLES + [["R", "U", "F", "L", "D", "B", "R", "U"]]:
+        cube = CubeModel.from_moves(scramble)
+        unidirectional.solve(cube)
+        solver.solve(cube)
+        print(f"{' '.join(scramble):<36}{unidirectional.stats.nodes:>10}{solver.stats.nodes:>14}"
+              f"{unidirectional.stats.elapsed:>10.3f}{solver.stats.elapsed:>16.3f}")
+
+def bench_beginner(num_of_cubes=200, seed=1):
+    load_beginner_tables()
+    solver = BeginnerSolver()
+    rng = random.Random(seed)
+    phases = {}
+    times = []
+    for _ in range(num_of_cubes):
+        solver.solve(CubeModel.from_moves([rng.choice(MOVES) for _ in range(30)]))
+        times.append(solver.stats.elapsed)
+        for phase, length, seconds in solver.phase_stats:
+            phases.setdefault(phase, []).append((length, seconds))
+    print(f"{'phase':<16}{'mean moves':>12}{'max moves':>11}{'mean ms':>10}{'max ms':>9}")
+    for phase, results in phases.items():
+        lengths = [length for length, _ in results]
+        seconds = [s for _, s in results]
+        print(f'{phase:<16}{sum(lengths) / num_of_cubes:>12.1f}{max(lengths):>11}'
+              f'{sum(seconds) / num_of_cubes * 1e3:>10.3f}{max(seconds) * 1e3:>9.3f}')
+    print(f'total seconds mean: {sum(times) / num_of_cubes:.4f}, max: {max(times):.4f}')
+
+BENCHMARKS = {
+    'moves': bench_moves,
+    'batch_moves': bench_batch_moves,
+    'faces_to_draw': bench_faces_to_draw,
+    'update': bench_update,
+    'ida_star': bench_ida_star,
+    'branching': bench_branching,
+    'transposition_table': bench_transposition_table,
+    'parallel': bench_parallel,
+    'two_phase': bench_two_phase,
+    'bidirectional': bench_bidirectional,
+    'beginner': bench_beginner,
+}
+
+if __name__ == '__main__':
+    for name in sys.argv[1:] or BENCHMARKS:
+        print(f'--- {name} ---')
+        BENCHMARKS[name]()
@@ -0,0 +1,190 @@
+# ---------- Bidirectional (meet-in-the-middle) solver ----------
+# A breadth-first search from the solved cube stores every state within
+# backward_depth moves, together with the move that reached it. The scrambled
+# cube is then searched with iterative deepening: for a solution length L only
+# the states exactly L - backward_depth moves away are generated and looked up
+# in the stored frontier. The first hit is an optimal solution; its second half
+# is read back from the frontier by undoing the stored moves one by one.
+#
+# The stored frontier is the memory hog, so it is a hashed set in one
+# array('Q'): every slot holds a 64 bit word, the state's hash above the index
+# of the move that reached it. Hashes can collide, so a hit only counts once
+# the stored moves lead back to the solved cube. Its depth is picked from
+# max_bytes, and it only depends on the solved state and is reused by every solve.
+
+from array import array
+import sys
+import time
+
+from cube_model import CubeModel, SOLVED_STATE, INVERSE_MOVES
+from ida_star_solver import MOVES, CANONICAL_SUCCESSORS, STOP_CHECK_MASK
+from solver import Solver, SolveStats, SearchBudget, SearchCancelled
+
+# Low bits of a frontier word: index into MOVES, NO_MOVE for the solved state
+MOVE_BITS = 5
+MOVE_MASK = (1 << MOVE_BITS) - 1
+NO_MOVE = MOVE_MASK
+MOVE_INDEX = {m: i for i, m in enumerate(MOVES)}
+# High bits: the state's hash with the top bit set, so a used slot is never 0
+HASH_MASK = (1 << (63 - MOVE_BITS)) - 1
+USED = 1 << 63
+SLOT_BYTES = array('Q').itemsize
+# Slots are at most half full, so a lookup of a missing state (most of them)
+# ends after about 2.5 probes
+MAX_LOAD = 0.5
+# A layer waiting to be expanded holds its states as bytes objects in a list
+LAYER_STATE_BYTES = sys.getsizeof(SOLVED_STATE) + 8
+
+def state_word(state):
+    # Frontier word of a state, without the move bits
+    return USED | (hash(state) & HASH_MASK) << MOVE_BITS
+
+def sequence_counts(max_length):
+    # Number of canonical move sequences of every length up to max_length, an
+    # upper bound on the number of distinct states that far from solved
+    counts = [1]
+    ending = {None: 1}
+    for _ in range(max_length):
+        next_ending = dict.fromkeys(MOVES, 0)
+        for last_move, count in ending.items():
+            for move in CANONICAL_SUCCESSORS[last_move]:
+                next_ending[move] += count
+        ending = next_ending
+        counts.append(sum(ending.values()))
+    return counts
+
+class BidirectionalSolver(Solver):
+    def __init__(self, max_length=20, max_bytes=64 * 1024 * 1024):
+        self.max_length = max_length
+        self.max_bytes = max_bytes
+        self.frontier = None
+        self.frontier_size = 0
+        self.backward_depth = 0
+        self.budget = None
+        self.stats = SolveStats()
+
+    def frontier_plan(self):
+        # (depth, slots) of the deepest frontier whose table and the two layers
+        # held while building it fit into max_bytes
+        counts = sequence_counts(self.max_length)
+        depth, slots = 0, 1
+        for d in range(1, self.max_length + 1):
+            needed = 1
+            while needed * MAX_LOAD < sum(counts[:d + 1]):
+                needed <<= 1
+            if needed * SLOT_BYTES + sum(counts[max(0, d - 2):d]) * LAYER_STATE_BYTES > self.max_bytes:
+                break
+            depth, slots = d, needed
+        return depth, slots
+
+    def build_frontier(self):
+        depth, slots = self.frontier_plan()
+        table = array('Q', [0]) * slots
+        self.frontier = table
+        self.frontier_size = 0
+        self._insert(state_word(SOLVED_STATE) | NO_MOVE)
+        layer = [SOLVED_STATE]
+        layer_moves = [None]
+        cube = CubeModel()
+        for d in range(depth):
+            last = d == depth - 1
+            next_layer = []
+            next_moves = []
+            for state, last_move in zip(layer, layer_moves):
+                for move in CANONICAL_SUCCESSORS[last_move]:
+                    cube.state = state
+                    cube.move(move)
+                    if self._insert(state_word(cube.state) | MOVE_INDEX[move]) and not last:
+                        next_layer.append(cube.state)
+                        next_moves.append(move)
+            layer = next_layer
+            layer_moves = next_moves
+        self.backward_depth = depth
+
+    def _insert(self, word):
+        # Adds word unless its state is stored already, True when it was added
+        table = self.frontier
+        mask = len(table) - 1
+        i = (word >> MOVE_BITS) & mask
+        while table[i]:
+            if table[i] >> MOVE_BITS == word >> MOVE_BITS:
+                return False
+            i = (i + 1) & mask
+        table[i] = word
+        self.frontier_size += 1
+        return True
+
+    def _lookup(self, state):
+        # Stored move index of a state, None when it is not in the frontier
+        table = self.frontier
+        mask = len(table) - 1
+        key = state_word(state) >> MOVE_BITS
+        i = key & mask
+        word = table[i]
+        while word:
+            if word >> MOVE_BITS == key:
+                return word & MOVE_MASK
+            i = (i + 1) & mask
+            word = table[i]
+        return None
+
+    def solve(self, start_cube: CubeModel, budget: SearchBudget = None) -> list:
+        # Raises SearchCancelled when the budget runs out
+        if self.frontier is None:
+            self.build_frontier()
+        self.stats = stats = SolveStats()
+        self.budget = budget
+        started = time.perf_counter()
+        cube = start_cube.clone()
+        path = []
+        try:
+            for length in range(self.max_length + 1):
+                stats.threshold = length
+                forward_depth = max(0, length - self.backward_depth)
+                backward_path = self._search(cube, path, forward_depth, None)
+                if backward_path is not None:
+                    stats.optimal = True
+                    return path + backward_path
+            return None
+        finally:
+            self.budget = None
+            stats.elapsed = time.perf_counter() - started
+
+    def _search(self, cube, path, togo, prev_move):
+        # Second half of the solution where the forward path meets the frontier, or None
+        self.stats.nodes += 1
+        if (self.budget is not None and not self.stats.nodes & STOP_CHECK_MASK
+                and self.budget.exhausted(self.stats.nodes)):
+            raise SearchCancelled()
+        if togo == 0:
+            move = self._lookup(cube.state)
+            return None if move is None else self._backward_path(cube.state, move)
+        self.stats.expanded += 1
+        state = cube.state
+        for move in CANONICAL_SUCCESSORS[prev_move]:
+            self.stats.generated += 1
+            cube.move(move)
+            path.append(move)
+            backward_path = self._search(cube, path, togo - 1, move)
+            cube.state = state
+            if backward_path is not None:
+                return backward_path
+            path.pop()
+        return None
+
+    def _backward_path(self, state, move):
+        # Undo the stored moves from the meeting state back to solved, None
+        # when a hash collision leads somewhere else
+        cube = CubeModel()
+        cube.state = state
+        moves = []
+        while move != NO_MOVE:
+            if len(moves) == self.backward_depth:
+                return None
+            inverse = INVERSE_MOVES[MOVES[move]]
+            moves.append(inverse)
+            cube.move(inverse)
+            move = self._lookup(cube.state)
+            if move is None:
+                return None
+        return moves if cube.is_solved() else None
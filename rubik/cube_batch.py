@@ -0,0 +1,75 @@
+# ---------- CubeBatch (many sticker states at once) ----------
+# N cube states as an (N, 54) uint8 array, one row per cube in the same
+# layout as CubeModel.state. A move is a single fancy-indexing gather over all
+# rows, using the sticker permutations of cube_model.MOVE_PERMUTATIONS, so the
+# batch and the single cube model always agree on what a move does.
+
+import numpy as np
+
+from cube_model import CubeModel, MOVE_PERMUTATIONS, NUM_OF_STICKERS, SOLVED_STATE
+
+# Move tokens in table order, and their permutations as index arrays
+MOVE_TOKENS = list(MOVE_PERMUTATIONS)
+MOVE_TABLE = np.array([MOVE_PERMUTATIONS[m] for m in MOVE_TOKENS], dtype=np.intp)
+MOVE_INDICES = {m: MOVE_TABLE[i] for i, m in enumerate(MOVE_TOKENS)}
+
+class CubeBatch:
+    def __init__(self, states):
+        states = np.asarray(states, dtype=np.uint8)
+        if states.ndim != 2 or states.shape[1] != NUM_OF_STICKERS:
+            raise Exception('Batch states should be an (N, 54) array.')
+        self.states = states
+
+    def solved(count):
+        return CubeBatch(np.tile(np.frombuffer(SOLVED_STATE, dtype=np.uint8), (count, 1)))
+
+    def from_models(cube_models):
+        return CubeBatch.from_states([c.state for c in cube_models])
+
+    def from_states(states):
+        # states: iterable of 54 byte CubeModel states
+        data = b''.join(states)
+        return CubeBatch(np.frombuffer(data, dtype=np.uint8).reshape(-1, NUM_OF_STICKERS))
+
+    def __len__(self):
+        return len(self.states)
+
+    def __getitem__(self, i):
+        cube_model = CubeModel()
+        cube_model.state = self.states[i].tobytes()
+        return cube_model
+
+    def to_models(self):
+        return [self[i] for i in range(len(self))]
+
+    def clone(self):
+        return CubeBatch(self.states.copy())
+
+    # Apply one move token to every cube
+    def move(self, m):
+        self.states = self.states[:, MOVE_INDICES[m]]
+
+    def apply(self, seq):
+        # The permutations are composed first, so the states are gathered once
+        index = np.arange(NUM_OF_STICKERS)
+        for m in seq:
+            index = index[MOVE_INDICES[m]]
+        self.states = self.states[:, index]
+
+    def move_each(self, move_ids):
+        # A different move per cube, given as indices into MOVE_TOKENS
+        self.states = np.take_along_axis(self.states, MOVE_TABLE[move_ids], axis=1)
+
+    def is_solved(self):
+        # Boolean array: every sticker matches the center of its face
+        faces = self.states.reshape(-1, 6, 9)
+        return (faces == faces[:, :, 4:5]).all(axis=(1, 2))
+
+    def equals(self, other):
+        # Boolean array comparing row by row with another batch, or every row
+        # with a single CubeModel
+        if isinstance(other, CubeModel):
+            other = np.frombuffer(other.state, dtype=np.uint8)
+        else:
+            other = other.states
+        return (self.states == other).all(axis=1)
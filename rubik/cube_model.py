@@ -1,12 +1,19 @@
 # ---------- CubeModel (sticker-based) ----------
 # Faces order: U, R, F, D, L, B
+#
+# The state is a 54 byte string: 6 faces × 9 stickers (row-major), one ASCII
+# face letter per sticker. Face turns are precomputed permutations of the
+# sticker indices, applied as new_state[i] = state[perm[i]].
 
-from collections import deque
-import copy
+from operator import itemgetter
 
 FACE_INDEX = {'U':0, 'R':1, 'F':2, 'D':3, 'L':4, 'B':5}
 INDEX_FACE = {v:k for k,v in FACE_INDEX.items()}
 
+NUM_OF_STICKERS = 54
+FACE_OFFSETS = range(0, NUM_OF_STICKERS, 9)
+SOLVED_STATE = b''.join(face.encode('ascii') * 9 for face in 'URFDLB')
+
 def rot_cw(face):
     # Rotate a 3x3 face 90° clockwise
     return [
@@ -30,165 +37,155 @@ def rot_180(face):
         face[2], face[1], face[0],
     ]
 
+# Side stickers cycled by a clockwise quarter turn, as (face, sticker indices).
+# Each strip receives the stickers of the next one: strips[k] <- strips[k+1].
+FACE_TURN_STRIPS = {
+    'U': [(2, (0, 1, 2)), (1, (0, 1, 2)), (5, (0, 1, 2)), (4, (0, 1, 2))],
+    'D': [(2, (6, 7, 8)), (4, (6, 7, 8)), (5, (6, 7, 8)), (1, (6, 7, 8))],
+    'R': [(0, (2, 5, 8)), (2, (2, 5, 8)), (3, (2, 5, 8)), (5, (6, 3, 0))],
+    'L': [(0, (0, 3, 6)), (5, (8, 5, 2)), (3, (0, 3, 6)), (2, (0, 3, 6))],
+    'F': [(0, (6, 7, 8)), (4, (8, 5, 2)), (3, (2, 1, 0)), (1, (0, 3, 6))],
+    'B': [(0, (0, 1, 2)), (1, (2, 5, 8)), (3, (8, 7, 6)), (4, (6, 3, 0))],
+}
+
+IDENTITY = tuple(range(NUM_OF_STICKERS))
+
+def face_turn_permutation(face):
+    perm = list(IDENTITY)
+    base = FACE_INDEX[face] * 9
+    for i, src in enumerate(rot_cw(list(range(9)))):
+        perm[base + i] = base + src
+    strips = FACE_TURN_STRIPS[face]
+    for k, (target_face, target_idx) in enumerate(strips):
+        source_face, source_idx = strips[(k + 1) % len(strips)]
+        for t, s in zip(target_idx, source_idx):
+            perm[target_face * 9 + t] = source_face * 9 + s
+    return tuple(perm)
+
+def x_180_permutation():
+    faces = [list(range(base, base + 9)) for base in FACE_OFFSETS]
+    faces[0], faces[3] = rot_180(faces[3]), rot_180(faces[0])
+    faces[2], faces[5] = rot_180(faces[5]), rot_180(faces[2])
+    return tuple(i for face in faces for i in face)
+
+def compose(*perms):
+    # Single permutation equivalent to applying perms one after the other
+    result = IDENTITY
+    for perm in perms:
+        result = tuple(result[i] for i in perm)
+    return result
+
+QUARTER_TURNS = {face: face_turn_permutation(face) for face in FACE_INDEX}
+
+# All 18 move tokens as single permutations: X, X' (X three times), X2 (X twice)
+MOVE_PERMUTATIONS = {}
+for face, perm in QUARTER_TURNS.items():
+    MOVE_PERMUTATIONS[face] = perm
+    MOVE_PERMUTATIONS[face + "'"] = compose(perm, perm, perm)
+    MOVE_PERMUTATIONS[face + '2'] = compose(perm, perm)
+
+_MOVE_GETTERS = {token: itemgetter(*perm) for token, perm in MOVE_PERMUTATIONS.items()}
+
+INVERSE_MOVES = {}
+for face in QUARTER_TURNS:
+    INVERSE_MOVES[face] = face + "'"
+    INVERSE_MOVES[face + "'"] = face
+    INVERSE_MOVES[face + '2'] = face + '2'
+
+_X_180_GETTER = itemgetter(*x_180_permutation())
+
 class CubeModel:
     def __init__(self):
-        # 6 faces × 9 stickers (row-major)
-        self.faces = [
-            ['U']*9,  # U
-            ['R']*9,  # R
-            ['F']*9,  # F
-            ['D']*9,  # D
-            ['L']*9,  # L
-            ['B']*9,  # B
-        ]
+        self.state = SOLVED_STATE
+
+    @property
+    def faces(self):
+        # Read-only view: 6 faces × 9 stickers (row-major)
+        return [list(self.state[base:base + 9].decode('ascii')) for base in FACE_OFFSETS]
 
     def rotate_x_180(self):
-        # Swap U and D faces
-        self.faces[0], self.faces[3] = self.faces[3], self.faces[0]
-        # You may also need to rotate the swapped faces to maintain orientation
-        self.faces[0] = rot_180(self.faces[0])
-        self.faces[3] = rot_180(self.faces[3])
-        # Swap and rotate F/B faces as needed for correct orientation
-        self.faces[2], self.faces[5] = rot_180(self.faces[5]), rot_180(self.faces[2])
+        # Swap U/D and F/B faces, each rotated by 180° to maintain orientation
+        self.state = bytes(_X_180_GETTER(self.state))
 
     def clone(self):
         c = CubeModel()
-        c.faces = copy.deepcopy(self.faces)
+        c.state = self.state
         return c
 
     def is_solved(self):
-        return all(all(s == row[0] for s in row) for row in self.faces)
+        s = self.state
+        return all(s.count(s[base + 4], base, base + 9) == 9 for base in FACE_OFFSETS)
 
-    # ---- Face turns (quarter-turn metric). Each mutates self.faces. ----
+    # ---- Face turns (quarter-turn metric). Each replaces self.state. ----
     # Notation: "U", "U'", "U2", ..., over standard Singmaster mapping.
 
     def U(self):
-        f = self.faces
-        f[0] = rot_cw(f[0])
-        (f[2][0], f[2][1], f[2][2],
-         f[1][0], f[1][1], f[1][2],
-         f[5][0], f[5][1], f[5][2],
-         f[4][0], f[4][1], f[4][2]) = (
-         f[1][0], f[1][1], f[1][2],
-         f[5][0], f[5][1], f[5][2],
-         f[4][0], f[4][1], f[4][2],
-         f[2][0], f[2][1], f[2][2])
+        self.state = bytes(_MOVE_GETTERS['U'](self.state))
 
     def U_(self):
-        for _ in range(3): self.U()
+        self.state = bytes(_MOVE_GETTERS["U'"](self.state))
 
     def U2(self):
-        for _ in range(2): self.U()
+        self.state = bytes(_MOVE_GETTERS['U2'](self.state))
 
     def D(self):
-        f = self.faces
-        f[3] = rot_cw(f[3])
-        (f[2][6], f[2][7], f[2][8],
-         f[4][6], f[4][7], f[4][8],
-         f[5][6], f[5][7], f[5][8],
-         f[1][6], f[1][7], f[1][8]) = (
-         f[4][6], f[4][7], f[4][8],
-         f[5][6], f[5][7], f[5][8],
-         f[1][6], f[1][7], f[1][8],
-         f[2][6], f[2][7], f[2][8])
+        self.state = bytes(_MOVE_GETTERS['D'](self.state))
 
     def D_(self):
-        for _ in range(3): self.D()
+        self.state = bytes(_MOVE_GETTERS["D'"](self.state))
 
     def D2(self):
-        for _ in range(2): self.D()
+        self.state = bytes(_MOVE_GETTERS['D2'](self.state))
 
     def R(self):
-        f = self.faces
-        f[1] = rot_cw(f[1])
-        (f[0][2], f[0][5], f[0][8],
-         f[2][2], f[2][5], f[2][8],
-         f[3][2], f[3][5], f[3][8],
-         f[5][6], f[5][3], f[5][0]) = (
-         f[2][2], f[2][5], f[2][8],
-         f[3][2], f[3][5], f[3][8],
-         f[5][6], f[5][3], f[5][0],
-         f[0][2], f[0][5], f[0][8])
+        self.state = bytes(_MOVE_GETTERS['R'](self.state))
 
     def R_(self):
-        for _ in range(3): self.R()
+        self.state = bytes(_MOVE_GETTERS["R'"](self.state))
 
     def R2(self):
-        for _ in range(2): self.R()
+        self.state = bytes(_MOVE_GETTERS['R2'](self.state))
 
     def L(self):
-        f = self.faces
-        f[4] = rot_cw(f[4])
-        (f[0][0], f[0][3], f[0][6],
-         f[5][8], f[5][5], f[5][2],
-         f[3][0], f[3][3], f[3][6],
-         f[2][0], f[2][3], f[2][6]) = (
-         f[5][8], f[5][5], f[5][2],
-         f[3][0], f[3][3], f[3][6],
-         f[2][0], f[2][3], f[2][6],
-         f[0][0], f[0][3], f[0][6])
+        self.state = bytes(_MOVE_GETTERS['L'](self.state))
 
     def L_(self):
-        for _ in range(3): self.L()
+        self.state = bytes(_MOVE_GETTERS["L'"](self.state))
 
     def L2(self):
-        for _ in range(2): self.L()
+        self.state = bytes(_MOVE_GETTERS['L2'](self.state))
 
     def F(self):
-        f = self.faces
-        f[2] = rot_cw(f[2])
-        (f[0][6], f[0][7], f[0][8],
-         f[1][0], f[1][3], f[1][6],
-         f[3][2], f[3][1], f[3][0],
-         f[4][8], f[4][5], f[4][2]) = (
-         f[4][8], f[4][5], f[4][2],
-         f[0][6], f[0][7], f[0][8],
-         f[1][0], f[1][3], f[1][6],
-         f[3][2], f[3][1], f[3][0])
+        self.state = bytes(_MOVE_GETTERS['F'](self.state))
 
     def F_(self):
-        for _ in range(3): self.F()
+        self.state = bytes(_MOVE_GETTERS["F'"](self.state))
 
     def F2(self):
-        for _ in range(2): self.F()
+        self.state = bytes(_MOVE_GETTERS['F2'](self.state))
 
     def B(self):
-        f = self.faces
-        f[5] = rot_cw(f[5])
-        (f[0][0], f[0][1], f[0][2],
-         f[4][0], f[4][3], f[4][6],
-         f[3][8], f[3][7], f[3][6],
-         f[1][2], f[1][5], f[1][8]) = (
-         f[1][2], f[1][5], f[1][8],
-         f[0][0], f[0][1], f[0][2],
-         f[4][0], f[4][3], f[4][6],
-         f[3][8], f[3][7], f[3][6])
+        self.state = bytes(_MOVE_GETTERS['B'](self.state))
 
     def B_(self):
-        for _ in range(3): self.B()
+        self.state = bytes(_MOVE_GETTERS["B'"](self.state))
 
     def B2(self):
-        for _ in range(2): self.B()
+        self.state = bytes(_MOVE_GETTERS['B2'](self.state))
 
     # Apply a single move token
     def move(self, m):
-        base = m[0]
-        suf = m[1:] if len(m) > 1 else ''
-        fn = getattr(self, base)
-        if suf == "'":
-            fn = getattr(self, base + "_")
-        elif suf == "2":
-            fn2 = getattr(self, base + "2")
-            fn2()
-            return
-        fn()
+        self.state = bytes(_MOVE_GETTERS[m](self.state))
 
     def apply(self, seq):
+        state = self.state
         for m in seq:
-            self.move(m)
+            state = bytes(_MOVE_GETTERS[m](state))
+        self.state = state
 
     def as_string(self):
-        return ';'.join(''.join(face) for face in self.faces)
+        s = self.state.decode('ascii')
+        return ';'.join(s[base:base + 9] for base in FACE_OFFSETS)
 
     def from_string(faces_str):
         cube_model = CubeModel()
@@ -197,10 +194,10 @@ class CubeModel:
         faces_str_list = faces_str.split(';')
         if len(faces_str_list) != 6:
             raise Exception('Faces string should represent 6 faces.')
-        for idx, face_str in enumerate(faces_str_list):
+        for face_str in faces_str_list:
             if len(face_str) != 9:
                 raise Exception('A face should have 9 tiles.')
-            cube_model.faces[idx] = list(face_str)
+        cube_model.state = ''.join(faces_str_list).encode('ascii')
         return cube_model
 
     def from_moves(moves):
@@ -2,14 +2,38 @@ import ui
 import numpy as np
 from math import radians, sin, cos
 from collections import deque
+from concurrent.futures import Future
 import random
 import logging
+import threading
 
 from cube_model import CubeModel
 from ida_star_solver import IdaStarSolver
+from two_phase_solver import TwoPhaseSolver
+from parallel_ida_star_solver import ParallelIdaStarSolver
+from bidirectional_solver import BidirectionalSolver
+from beginner_solver import BeginnerSolver
+from move_optimizer import optimize_moves
+from anytime_solver import AnytimeSolver
+from solver import SearchBudget, SearchCancelled, CancellationToken
+from frame_profiler import FrameProfiler
 
 NUM_OF_SCRAMBLE_MOVES = 6
 
+# Solver used by Cube.solve_async(): 'ida_star' (optimal, slow), 'parallel_ida_star'
+# (optimal, all cores), 'bidirectional' (optimal, memory for speed),
+# 'two_phase' (near-optimal, fast) or 'beginner' (long solutions, milliseconds)
+SOLVER = 'ida_star'
+SOLVERS = {
+    'ida_star': IdaStarSolver,
+    'parallel_ida_star': ParallelIdaStarSolver,
+    'two_phase': TwoPhaseSolver,
+    'bidirectional': BidirectionalSolver,
+    'beginner': BeginnerSolver,
+}
+# Seconds the solver may search before the fast two-phase fallback takes over
+SOLVE_TIMEOUT = 5.0
+
 CUBE_SIZE = 0.5
 CUBE_GAP = 1.01
 
@@ -33,6 +57,36 @@ FACES = [
     ([1, 2, 6, 5], 'right'),
     ([0, 3, 7, 4], 'left'),
 ]
+FACE_VERTEX_INDICES = np.array([indices for indices, _ in FACES])
+# Outward normals of FACES in cubelet coordinates
+FACE_NORMALS = np.array([
+    [0, 0, -1], [0, 0, 1], [0, -1, 0], [0, 1, 0], [1, 0, 0], [-1, 0, 0],
+])
+# Cubelet face -> grid coordinate (axis, value) of the cube side it lies on
+FACE_SIDES = {
+    'back': (2, -1), 'front': (2, 1), 'bottom': (1, -1),
+    'top': (1, 1), 'right': (0, 1), 'left': (0, -1),
+}
+
+AXES = ['x', 'y', 'z']
+
+def quarter_turn_matrix(axis, degrees):
+    # Exact integer version of Cube.rotation_matrix(axis, radians(±90))
+    i = AXES.index(axis)
+    j, k = (i + 1) % 3, (i + 2) % 3
+    sign = 1 if degrees > 0 else -1
+    m = np.zeros((3, 3), dtype=int)
+    m[i, i] = 1
+    m[j, k] = -sign
+    m[k, j] = sign
+    return m
+
+QUARTER_TURN_MATRICES = {(axis, degrees): quarter_turn_matrix(axis, degrees)
+                         for axis in AXES for degrees in (90, -90)}
+
+# Perspective: the camera is FOCAL_LENGTH in front of the origin, looking at +z
+FOCAL_LENGTH = 3
+CAMERA_POSITION = np.array([0, 0, -FOCAL_LENGTH])
 
 # Map move notation to: (axis, layer_index, quarter_turns, direction)
 # Your cube local axes: x (L/R), y (D/U), z (B/F); layer_index: -1,0,1
@@ -51,33 +105,50 @@ MOVE_BUTTONS = ['U', 'D', 'L', 'R', 'F', 'B']
 
 DEGREES_PER_FRAME = 9
 
-def play_moves(cube, moves):
-    cube.play_moves(moves)
+def play_moves(cube, moves, instant=True):
+    # Plays the moves to the end without drawing: instantly, or frame by frame
+    cube.play_moves(moves, instant=instant)
     current_move, moves_left = cube.update()
     while current_move is not None or moves_left > 0:
         current_move, moves_left = cube.update()
 
-class Cubelet:
-    def __init__(self, pos):
-        self.grid_pos = np.array(pos)
-        self.center = self.grid_pos * CUBE_SIZE * CUBE_GAP
-        self.rotation = np.identity(3)
-
-    # Rotate by a given 3x3 rotation matrix in world space
-    def rotate(self, R):
-        self.center = R @ self.center
-        self.rotation = R @ self.rotation
-
-    def finalize_rotation(self):
-        # snap using the actual spacing (size * gap)
-        spacing = CUBE_SIZE * CUBE_GAP
-        self.grid_pos = np.round(self.center / spacing).astype(int)
-        self.center = self.grid_pos * spacing
+class Cubelets:
+    # Structure of arrays for the 27 cubelets: start grid positions (27, 3),
+    # world space centers (27, 3) and orientations (27, 3, 3)
+    def __init__(self):
+        self.grid_pos = np.array([(x, y, z) for x in [-1, 0, 1] for y in [-1, 0, 1] for z in [-1, 0, 1]])
+        self.centers = self.grid_pos * CUBE_SIZE * CUBE_GAP
+        self.rotations = np.tile(np.identity(3), (len(self.grid_pos), 1, 1))
+
+    def __len__(self):
+        return len(self.grid_pos)
+
+    # Rotate the given cubelets (all by default) by a 3x3 rotation matrix in world space
+    def rotate(self, R, members=slice(None)):
+        self.centers[members] = self.centers[members] @ R.T
+        self.rotations[members] = R @ self.rotations[members]
+
+    def cube_coordinates(self, global_R, members=slice(None)):
+        # Integer grid positions and orientations in cube coordinates
+        # (global_R maps cube to world space)
+        positions = np.round(self.centers[members] @ global_R / (CUBE_SIZE * CUBE_GAP)).astype(int)
+        orientations = np.round(global_R.T @ self.rotations[members]).astype(int)
+        return positions, orientations
+
+    def set_cube_coordinates(self, global_R, positions, orientations, members=slice(None)):
+        self.centers[members] = (positions * (CUBE_SIZE * CUBE_GAP)) @ global_R.T
+        self.rotations[members] = global_R @ orientations
+
+    def snap(self, global_R, members=slice(None)):
+        # Round the cubelets to exact grid positions and quarter turn orientations,
+        # removing the drift of the animation steps
+        self.set_cube_coordinates(global_R, *self.cube_coordinates(global_R, members), members)
 
 class Cube:
-    def __init__(self):
+    def __init__(self, solver=SOLVER):
         self.global_R = np.identity(3) # cube's physical orientation in world space
-        self.cubelets = [Cubelet((x, y, z)) for x in [-1, 0, 1] for y in [-1, 0, 1] for z in [-1, 0, 1]]
+        self.global_R_inv = np.identity(3)
+        self.cubelets = Cubelets()
         # handy base offsets for drawing (local cubelet corners)
         d = CUBE_SIZE / 2.0
         self.local_offsets = np.array([
@@ -90,16 +161,79 @@ class Cube:
             [ d,  d,  d],    # 6
             [-d,  d,  d],    # 7
         ])
+        # Sticker colors per cubelet face: outer faces keep the color of the side
+        # they started on, every other face is inner
+        self._outer_faces = np.array([self.cubelets.grid_pos[:, axis] == side
+                                      for axis, side in (FACE_SIDES[name] for _, name in FACES)]).T
+        self._face_colors = np.empty(self._outer_faces.shape, dtype=object)
+        for i, (_, name) in enumerate(FACES):
+            self._face_colors[:, i] = [FACE_COLORS[name]] * len(self.cubelets)
+        self._face_colors[~self._outer_faces] = FACE_COLOR_INNER
         self.logic = CubeModel()
-        self.solver = IdaStarSolver()
+        self.solver = AnytimeSolver(SOLVERS[solver](), timeout=SOLVE_TIMEOUT)
         self._move_queue = deque()
         self._current_move = None
         self._remaining = 0
+        # Cubelets of the slice that is turning, found once when the move starts
+        self._slice_members = None
         self._step = DEGREES_PER_FRAME  # degrees per frame for animation
+        # Background solve: future of the worker thread and its cancellation token
+        self._solve_future = None
+        self._solve_token = None
+        # Why the last background solve failed, None when it did not
+        self.solve_error = None
         
-    def solve(self):
-        solution = self.solver.solve(self.logic.clone())
-        logging.info('Solve Rubik\'s Cube. solution: %s', solution)
+    def solve_async(self):
+        # Solves on a worker thread, update() plays the solution once it is ready
+        self._solve_token = CancellationToken()
+        self.solve_error = None
+        budget = SearchBudget(SOLVE_TIMEOUT, token=self._solve_token)
+        cube = self.logic.clone()
+        future = Future()
+
+        def run():
+            try:
+                future.set_result(self.solver.solve(cube, budget))
+            except Exception as e:
+                future.set_exception(e)
+
+        self._solve_future = future
+        threading.Thread(target=run, daemon=True).start()
+        return future
+
+    def is_solving(self):
+        return self._solve_future is not None
+
+    def cancel_solve(self):
+        if self._solve_token:
+            self._solve_token.cancel()
+
+    def solve_progress(self):
+        # (iteration bound, nodes searched) of the running solver
+        stats = self.solver.current.stats
+        return stats.threshold, stats.nodes
+
+    def _finish_solve(self):
+        # Runs on the UI thread: a failed solve is logged and leaves the cube
+        # idle instead of raising out of update()
+        future = self._solve_future
+        self._solve_future = None
+        self._solve_token = None
+        try:
+            solution = future.result()
+        except SearchCancelled:
+            logging.info('Solve Rubik\'s Cube cancelled.')
+            return
+        except Exception as e:
+            logging.exception('Solve Rubik\'s Cube failed.')
+            self.solve_error = str(e) or type(e).__name__
+            return
+        if solution is None:
+            logging.warning('Solve Rubik\'s Cube found no solution.')
+            self.solve_error = 'no solution'
+            return
+        solution = optimize_moves(solution)
+        logging.info('Solve Rubik\'s Cube. solution: %s (optimal: %s)', solution, self.solver.stats.optimal)
         self.play_moves(solution)
 
     def scramble(self):
@@ -114,13 +248,16 @@ class Cube:
                 m = random.choice(tokens)
             last_face = m[0]
             seq.append(m)
+        seq = optimize_moves(seq)
         logging.info('Scramble Rubik\'s Cube. random moves: %s', seq)
         self.play_moves(seq)
 
     def is_scrambled(self):
         return not self.logic.is_solved()
 
-    def play_moves(self, moves, degrees_per_frame=9):
+    def play_moves(self, moves, degrees_per_frame=9, instant=False):
+        # instant: apply every quarter turn at once instead of animating it,
+        # ending in exactly the state the animation ends in
         logging.info('Play moves: %s', moves)
         self._move_queue = deque()
         for token in moves:
@@ -131,33 +268,63 @@ class Cube:
         self._current_move = None
         self._remaining = 0
         self._step = degrees_per_frame
+        if instant:
+            self._play_instantly()
+
+    def _play_instantly(self):
+        # Turns the queued quarter turns as integer permutations of the grid
+        # positions and orientations in cube coordinates, then writes the world
+        # space arrays the way snap() does
+        cubelets = self.cubelets
+        positions, orientations = cubelets.cube_coordinates(self.global_R)
+        turned = np.zeros(len(cubelets), dtype=bool)
+        while self._move_queue:
+            axis, layer, total_deg = self._move_queue.popleft()
+            members = positions[:, AXES.index(axis)] == layer
+            turn = QUARTER_TURN_MATRICES[axis, total_deg]
+            positions[members] = positions[members] @ turn.T
+            orientations[members] = turn @ orientations[members]
+            turned |= members
+            self._move_logic(axis, layer, total_deg)
+        cubelets.set_cube_coordinates(self.global_R, positions[turned], orientations[turned], turned)
 
     def rotate_cube(self, axis, angle_rad):
         R = self.rotation_matrix(axis, angle_rad)
         self.global_R = R @ self.global_R
-        for c in self.cubelets:
-            c.rotate(R)
+        # Rotations are orthonormal: the inverse is the transpose
+        self.global_R_inv = self.global_R.T
+        self.cubelets.rotate(R)
 
     def update(self):
+        if self._solve_future is not None and self._solve_future.done():
+            self._finish_solve()
+
         if self._current_move is None and self._move_queue:
             self._current_move = self._move_queue.popleft()
             self._remaining = abs(self._current_move[2])
+            self._slice_members = self.slice_members(*self._current_move[:2])
 
         if self._current_move:
             axis, layer, total_deg = self._current_move
             step = min(self._step, self._remaining)
             angle = radians(step if total_deg > 0 else -step)
-            self.rotate_slice(axis, layer, angle)
+            self.rotate_slice(axis, layer, angle, self._slice_members)
             self._remaining -= step
             if self._remaining <= 0:
-                token = self.last_token_from_move(axis, layer, total_deg)
-                if token:
-                    self.logic.move(token)
-                    logging.debug('Current cube model state: %s', self.logic.as_string())
+                self.cubelets.snap(self.global_R, self._slice_members)
+                self._move_logic(axis, layer, total_deg)
                 self._current_move = None
 
         return (self._current_move, len(self._move_queue))
 
+    def _move_logic(self, axis, layer, total_deg):
+        # Keeps the logic model in step with a finished quarter turn, turns
+        # without a token (not a face turn) leave it unchanged
+        token = self.last_token_from_move(axis, layer, total_deg)
+        if token:
+            self.logic.move(token)
+            logging.debug('Current cube model state: %s', self.logic.as_string())
+
     def last_token_from_move(self, axis, layer, total_deg):
         # Convert (axis,layer,±90) to token (U,D,L,R,F,B or their primes).
         if abs(total_deg) != 90: return None
@@ -170,28 +337,26 @@ class Cube:
         if axis == 'z' and layer == -1: return "B'" if total_deg>0 else "B"
         return None
 
-    def rotate_slice(self, axis, layer_index, angle_rad):
-        local_axis = np.zeros(3)
-        local_axis[['x', 'y', 'z'].index(axis)] = 1.0
-        world_axis = self.global_R @ local_axis
+    def slice_members(self, axis, layer_index):
+        # Indices of the cubelets in a slice, from their centers in cube coordinates
+        local_centers = self.cubelets.centers @ self.global_R_inv.T
+        coords = np.round(local_centers[:, AXES.index(axis)] / (CUBE_SIZE * CUBE_GAP))
+        return np.flatnonzero(coords == layer_index)
+
+    def rotate_slice(self, axis, layer_index, angle_rad, members=None):
+        if members is None:
+            members = self.slice_members(axis, layer_index)
+        world_axis = self.global_R[:, AXES.index(axis)]
         R = self.rotation_matrix_from_vector(world_axis, angle_rad)
-        spacing = CUBE_SIZE * CUBE_GAP
-        for cubelet in self.cubelets:
-            local_center = np.linalg.inv(self.global_R) @ cubelet.center
-            coord = round(local_center[['x','y','z'].index(axis)] / spacing)
-            if coord == layer_index:
-                cubelet.center = R @ cubelet.center
-                cubelet.rotation = R @ cubelet.rotation
+        self.cubelets.rotate(R, members)
 
     def project(self, points, scale=100, offset=(0, 0)):
-        result = []
-        for x, y, z in points:
-            f = 3
-            factor = f / (f + z)
-            x2d = x * scale * factor + offset[0]
-            y2d = -y * scale * factor + offset[1]
-            result.append((x2d, y2d))
-        return result
+        # Perspective projection of an (..., 3) array of points to (..., 2)
+        factor = FOCAL_LENGTH / (FOCAL_LENGTH + points[..., 2])
+        projected = np.empty(points.shape[:-1] + (2,))
+        projected[..., 0] = points[..., 0] * scale * factor + offset[0]
+        projected[..., 1] = -points[..., 1] * scale * factor + offset[1]
+        return projected
 
     def rotation_matrix(self, axis, theta):
         c, s = cos(theta), sin(theta)
@@ -213,37 +378,39 @@ class Cube:
             [z*x*C - y*s, z*y*C + x*s, c + z*z*C]
         ])
 
-    def faces_to_draw(self, offset=(0, 0)):
-        all_faces = []
-        for c in self.cubelets:
-            verts_world = (self.local_offsets @ c.rotation.T) + c.center
-            projected = self.project(verts_world, offset=offset)
-            x, y, z = c.grid_pos
-            visible_faces = {
-                'back':     (z == -1),
-                'front':    (z ==  1),
-                'left':     (x == -1),
-                'right':    (x ==  1),
-                'bottom':   (y == -1),
-                'top':      (y ==  1)
-            }
-
-            for indices, face_name in FACES:
-                face_color = FACE_COLORS[face_name]
-                if not visible_faces[face_name]:
-                    face_color = FACE_COLOR_INNER
-
-                face3d = verts_world[indices]
-                face2d = [projected[i] for i in indices]
-                avg_depth = float(np.mean(face3d[:, 2]))
-                all_faces.append((avg_depth, face2d, face_color, face3d))
-
-        # Painter's algorithm with stable tie-breakers to avoid flicker
-        all_faces.sort(
-            key=lambda f: (round(f[0], 6), round(np.min(f[3][:,0]), 6), round(np.min(f[3][:,1]), 6)),
-            reverse=True
-        )
-        return all_faces
+    def faces_to_draw(self, offset=(0, 0), profiler=None):
+        # All cubelets at once: (27, 8, 3) world vertices, (27, 6, 4, 3) faces
+        rotations = self.cubelets.rotations
+        centers = self.cubelets.centers
+        verts_world = np.einsum('vj,cij->cvi', self.local_offsets, rotations) + centers[:, None, :]
+        faces3d = verts_world[:, FACE_VERTEX_INDICES]
+        faces2d = self.project(faces3d, offset=offset)
+
+        # Back-face culling: keep faces whose outward normal points to the camera.
+        # Inner faces are hidden too unless a slice is turning and opens a gap.
+        normals = np.einsum('cij,fj->cfi', rotations, FACE_NORMALS)
+        to_camera = CAMERA_POSITION - faces3d.mean(axis=2)
+        visible = np.einsum('cfi,cfi->cf', normals, to_camera) > 0
+        if self._current_move is None:
+            visible &= self._outer_faces
+
+        faces3d = faces3d[visible]
+        faces2d = faces2d[visible]
+        colors = self._face_colors[visible]
+        depths = faces3d[:, :, 2].mean(axis=1)
+        if profiler:
+            profiler.mark('faces_to_draw')
+        # Painter's algorithm, far to near, with stable tie-breakers to avoid flicker
+        order = np.lexsort((
+            -np.round(faces3d[:, :, 1].min(axis=1), 6),
+            -np.round(faces3d[:, :, 0].min(axis=1), 6),
+            -np.round(depths, 6),
+        ))
+        faces2d = faces2d.tolist()
+        faces = [(depths[i], faces2d[i], colors[i], faces3d[i]) for i in order]
+        if profiler:
+            profiler.mark('sort')
+        return faces
 
 class ActionButton:
     def __init__(self, view, click):
@@ -340,15 +507,30 @@ class RubiksCubeView (ui.View):
         self.info_label = InfoLabel()
         self.cube = Cube()
         self._waiting_idle = False
+        # Optional FrameProfiler, switched with enable_profiler()/disable_profiler()
+        self.profiler = None
+
+    def enable_profiler(self, capacity=600):
+        self.profiler = FrameProfiler(self.update_interval, capacity)
+        return self.profiler
+
+    def disable_profiler(self):
+        self.profiler = None
 
     def click_action(self, sender):
         self._waiting_idle = False
         self.move_buttons.disable()
-        self.btn.disable()
-        if self.cube.is_scrambled():
+        if self.cube.is_solving():
+            self.btn.disable()
+            self.info_label.msg('Cancel...')
+            self.cube.cancel_solve()
+        elif self.cube.is_scrambled():
+            # The button stays enabled as the Cancel button while the solver runs
             self.info_label.msg('Solve...')
-            self.cube.solve()
+            self.btn.update_title('Cancel')
+            self.cube.solve_async()
         else:
+            self.btn.disable()
             self.info_label.msg('Scramble..')
             self.cube.scramble()
 
@@ -363,15 +545,26 @@ class RubiksCubeView (ui.View):
         self.cube.rotate_cube(axis, angle_rad)
 
     def update(self):
+        profiler = self.profiler
+        if profiler:
+            profiler.begin_frame()
         self.info_label.update(self)
         current_move, num_of_remaining_moves = self.cube.update()
+        if profiler:
+            profiler.mark('cube_update')
         
-        if current_move is None:
+        if self.cube.is_solving():
+            threshold, nodes = self.cube.solve_progress()
+            self.info_label.msg(f'Solving... depth: {threshold}, nodes: {nodes}')
+        elif current_move is None:
             if num_of_remaining_moves > 0:
                 self.info_label.msg('Number of moves left: ' + str(num_of_remaining_moves))
                 self._waiting_idle = False
             elif not self._waiting_idle:
-                self.info_label.msg('Ready')
+                # A failed solve is reported once, later moves end in 'Ready'
+                error = self.cube.solve_error
+                self.cube.solve_error = None
+                self.info_label.msg(f'Solve failed: {error}' if error else 'Ready')
                 self._waiting_idle = True
                 self.move_buttons.enable()
                 self.btn.enable()
@@ -379,13 +572,21 @@ class RubiksCubeView (ui.View):
                 self.btn.update_title(title)
         
         self.set_needs_display()
+        if profiler:
+            profiler.mark('view_update')
 
     def draw(self):
+        profiler = self.profiler
+        if profiler:
+            profiler.start()
         all_faces = self.cube.faces_to_draw(
-            offset=(self.width / 2, self.height / 2)
+            offset=(self.width / 2, self.height / 2),
+            profiler=profiler
         )
         for _, pts, color, _ in all_faces:
             self.draw_poly(pts, color)
+        if profiler:
+            profiler.mark('draw_poly')
 
     def draw_poly(self, pts, color):
         path = ui.Path()
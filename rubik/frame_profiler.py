@@ -0,0 +1,82 @@
+# ---------- Frame profiler ----------
+# Opt-in per-frame timings of the view's hot path. A frame is one update()
+# plus the draw() that follows it. Every stage adds the time since the previous
+# mark, and a finished frame becomes one row of a ring buffer that keeps the
+# last `capacity` frames. When the view has no profiler nothing is timed.
+
+import csv
+import time
+
+import numpy as np
+
+# update(): Cube.update() and the rest of the view update
+# draw(): faces_to_draw() transform and culling, its depth sort, ui.Path drawing
+STAGES = ['cube_update', 'view_update', 'faces_to_draw', 'sort', 'draw_poly']
+# A frame taking more than DROP_FACTOR frame budgets misses at least one display refresh
+DROP_FACTOR = 1.5
+
+class FrameProfiler:
+    def __init__(self, frame_budget=0.05, capacity=600, stages=STAGES):
+        self.frame_budget = frame_budget
+        self.capacity = capacity
+        self.stages = list(stages)
+        self._stage_index = {stage: i for i, stage in enumerate(self.stages)}
+        # Columns: stages, frame work total, interval since the previous frame
+        self.frames = np.zeros((capacity, len(self.stages) + 2))
+        self.count = 0
+        self.dropped = 0
+        self._current = None
+        self._frame_started = None
+        self._last = 0.0
+
+    def begin_frame(self):
+        now = time.perf_counter()
+        if self._current is not None:
+            self._store(now - self._frame_started)
+        self._current = np.zeros(len(self.stages))
+        self._frame_started = now
+        self._last = now
+
+    def start(self):
+        # Resume timing after a pause between stages (e.g. between update and draw)
+        self._last = time.perf_counter()
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        if self._current is not None:
+            self._current[self._stage_index[stage]] += now - self._last
+        self._last = now
+
+    def _store(self, interval):
+        work = self._current.sum()
+        self.frames[self.count % self.capacity] = np.concatenate((self._current, [work, interval]))
+        self.count += 1
+        if work > self.frame_budget or interval > DROP_FACTOR * self.frame_budget:
+            self.dropped += 1
+
+    def _rows(self):
+        return self.frames[:min(self.count, self.capacity)]
+
+    def summary(self):
+        # Rolling p50/p95/max in seconds per stage (and the whole frame) over the buffer
+        rows = self._rows()
+        result = {}
+        for i, name in enumerate(self.stages + ['frame']):
+            values = rows[:, i]
+            if len(values):
+                p50, p95 = np.percentile(values, [50, 95])
+                result[name] = {'p50': p50, 'p95': p95, 'max': values.max()}
+            else:
+                result[name] = {'p50': 0.0, 'p95': 0.0, 'max': 0.0}
+        return result
+
+    def write_csv(self, f):
+        # Buffered frames, oldest first, as CSV with seconds per column
+        rows = self._rows()
+        if self.count > self.capacity:
+            rows = np.roll(rows, -(self.count % self.capacity), axis=0)
+        first = self.count - len(rows)
+        writer = csv.writer(f)
+        writer.writerow(['frame'] + self.stages + ['frame_total', 'interval'])
+        for i, row in enumerate(rows):
+            writer.writerow([first + i] + [f'{v:.6f}' for v in row])
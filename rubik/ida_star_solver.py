@@ -1,5 +1,7 @@
-from cube_model import CubeModel
-from solver import Solver
+from cube_model import CubeModel, FACE_OFFSETS
+from solver import Solver, SolveStats, SearchBudget, SearchCancelled
+from pattern_database import load_pattern_databases
+import time
 
 MOVES = [
     'U', "U'", 'U2',
@@ -10,56 +12,153 @@ MOVES = [
     'B', "B'", 'B2'
 ]
 
+# Opposite faces commute, so of the orders "U D" and "D U" only the first one
+# (in MOVES order) is searched.
+OPPOSITE_FACES = {'U': 'D', 'D': 'U', 'R': 'L', 'L': 'R', 'F': 'B', 'B': 'F'}
+FACE_ORDER = {m[0]: i for i, m in enumerate(MOVES)}
+
+# should_stop and the budget are polled every STOP_CHECK_MASK + 1 nodes
+STOP_CHECK_MASK = 0x3FF
+
+def successor_table(canonical=True):
+    # Moves allowed after each move (and after None at the root)
+    table = {None: list(MOVES)}
+    for prev in MOVES:
+        if canonical:
+            table[prev] = [m for m in MOVES if m[0] != prev[0]
+                           and not (m[0] == OPPOSITE_FACES[prev[0]] and FACE_ORDER[m[0]] < FACE_ORDER[prev[0]])]
+        else:
+            # Only consecutive moves of the same face with a different amount
+            table[prev] = [m for m in MOVES if m[0] != prev[0] or m == prev]
+    return table
+
+CANONICAL_SUCCESSORS = successor_table(canonical=True)
+SAME_FACE_SUCCESSORS = successor_table(canonical=False)
+
 class IdaStarSolver(Solver):
-    def __init__(self, max_depth=20):
+    def __init__(self, max_depth=20, pattern_databases=None, transposition_table=None, canonical_moves=True):
         self.max_depth = max_depth
+        self.canonical_moves = canonical_moves
+        self.successors = CANONICAL_SUCCESSORS if canonical_moves else SAME_FACE_SUCCESSORS
+        # Pattern databases are picked up automatically when their table files exist
+        if pattern_databases is None:
+            pattern_databases = load_pattern_databases()
+        self.pattern_databases = pattern_databases
+        # Optional TranspositionTable remembering lower bounds across iterations
+        self.transposition_table = transposition_table
+        # Optional callable polled during the search, True cancels it
+        self.should_stop = None
+        # SearchBudget of the running solve() call
+        self.budget = None
+        self.stats = SolveStats()
 
     def heuristic(self, cube: CubeModel):
+        state = cube.state
+        if self.pattern_databases:
+            # Placements are read once per cubie set, not once per database
+            placements = {}
+            h = 0
+            for db in self.pattern_databases:
+                cubie_set = db.pattern.cubie_set
+                if cubie_set not in placements:
+                    placements[cubie_set] = cubie_set.placements(state)
+                h = max(h, db.lookup_placements(placements[cubie_set]))
+            return h
         # Simple heuristic: count misplaced stickers (not optimal, but admissible)
         count = 0
-        for face in cube.faces:
-            center = face[4]
-            count += sum(1 for s in face if s != center)
+        for base in FACE_OFFSETS:
+            count += 9 - state.count(state[base + 4], base, base + 9)
         return count // 8  # Dividing to keep heuristic lower (admissible)
 
-    def solve(self, start_cube: CubeModel) -> list:
-        threshold = self.heuristic(start_cube)
+    def solve(self, start_cube: CubeModel, budget: SearchBudget = None) -> list:
+        # Raises SearchCancelled when the budget runs out
+        self.stats = stats = SolveStats()
+        self.budget = budget
+        started = time.perf_counter()
+        # A single cube is mutated along the search path: make a move, recurse,
+        # then unmake it by restoring the parent's (immutable) state bytes.
+        cube = start_cube.clone()
+        threshold = self.heuristic(cube)
         path = []
         visited = set()
+        table = self.transposition_table
 
-        def search(cube, g, prev_move):
-            f = g + self.heuristic(cube)
+        try:
+            while threshold <= self.max_depth:
+                stats.threshold = threshold
+                visited.clear()
+                if table:
+                    table.new_generation()
+                result = self._search(cube, path, visited, threshold)
+                if result is True:
+                    stats.optimal = True
+                    return path.copy()
+                if result == float('inf'):
+                    break
+                threshold = result
+            return None
+        finally:
+            self.budget = None
+            stats.elapsed = time.perf_counter() - started
+
+    def _stop_requested(self):
+        if self.should_stop is not None and self.should_stop():
+            return True
+        return self.budget is not None and self.budget.exhausted(self.stats.nodes)
+
+    def _search(self, cube, path, visited, threshold, frontier=None, split_depth=0):
+        # Depth first search below path, which is already applied to cube. Returns
+        # True when a solution was found (left in path), otherwise the smallest f
+        # over the threshold. With a frontier list, unsolved nodes at split_depth
+        # are collected there (as move prefixes) instead of being searched.
+        stats = self.stats
+        table = self.transposition_table
+        successors = self.successors
+
+        def search(g, prev_move):
+            stats.nodes += 1
+            if not stats.nodes & STOP_CHECK_MASK and self._stop_requested():
+                raise SearchCancelled()
+            state = cube.state
+            h = self.heuristic(cube)
+            if table and g + h <= threshold:
+                # Only nodes that would be expanded are probed: pruned ones are
+                # never stored. Bounds depend on the moves allowed after
+                # prev_move as well.
+                key = hash((state, prev_move))
+                h = max(h, table.get(key))
+            f = g + h
             if f > threshold:
                 return f
             if cube.is_solved():
                 return True
+            if frontier is not None and g == split_depth:
+                frontier.append(path.copy())
+                return float('inf')
             min_threshold = float('inf')
-            for move in MOVES:
-                # Prune consecutive inverse moves
-                if prev_move and move[0] == prev_move[0] and move != prev_move:
-                    continue
-                next_cube = cube.clone()
-                next_cube.move(move)
-                state_str = next_cube.as_string()
-                if state_str in visited:
+            # A bound is only stored when no child was skipped for being on the path
+            exact_bound = True
+            stats.expanded += 1
+            for move in successors[prev_move]:
+                stats.generated += 1
+                cube.move(move)
+                next_state = cube.state
+                if next_state in visited:
+                    cube.state = state
+                    exact_bound = False
                     continue
-                visited.add(state_str)
+                visited.add(next_state)
                 path.append(move)
-                result = search(next_cube, g + 1, move)
+                result = search(g + 1, move)
                 if result is True:
                     return True
                 if isinstance(result, int) and result < min_threshold:
                     min_threshold = result
                 path.pop()
-                visited.remove(state_str)
+                visited.remove(next_state)
+                cube.state = state
+            if table and exact_bound and min_threshold != float('inf'):
+                table.put(key, min_threshold - g, threshold - g)
             return min_threshold
 
-        while threshold <= self.max_depth:
-            visited.clear()
-            result = search(start_cube, 0, None)
-            if result is True:
-                return path.copy()
-            if result == float('inf'):
-                break
-            threshold = result
-        return None
+        return search(len(path), path[-1] if path else None)
@@ -0,0 +1,42 @@
+# ---------- Move sequence optimizer ----------
+# Rewrites a move sequence into a shorter equivalent one: consecutive turns of
+# the same face are merged (U U -> U2, U U' -> nothing, U U U -> U'), also
+# across a turn of the opposite face, which commutes with them (R L R' -> L).
+# Pairs of opposite face turns are written in a fixed order (U D, never D U).
+
+from cube_model import CubeModel
+from ida_star_solver import OPPOSITE_FACES, FACE_ORDER
+
+# Suffix <-> number of clockwise quarter turns
+QUARTER_TURNS_OF = {'': 1, '2': 2, "'": 3}
+SUFFIX_OF = {n: suffix for suffix, n in QUARTER_TURNS_OF.items()}
+
+def optimize_moves(moves, verify=False):
+    # Faces and quarter turn counts of the result. Only the last two entries
+    # can merge with the next move: the last one, or the one before it when
+    # the last one is a turn of the opposite face.
+    faces = []
+    turns = []
+    for m in moves:
+        face = m[0]
+        i = len(faces) - 1
+        if i >= 0 and faces[i] == OPPOSITE_FACES[face]:
+            i -= 1
+        if i >= 0 and faces[i] == face:
+            n = (turns[i] + QUARTER_TURNS_OF[m[1:]]) % 4
+            if n:
+                turns[i] = n
+            else:
+                del faces[i]
+                del turns[i]
+        else:
+            faces.append(face)
+            turns.append(QUARTER_TURNS_OF[m[1:]])
+    for i in range(1, len(faces)):
+        if faces[i] == OPPOSITE_FACES[faces[i - 1]] and FACE_ORDER[faces[i]] < FACE_ORDER[faces[i - 1]]:
+            faces[i - 1], faces[i] = faces[i], faces[i - 1]
+            turns[i - 1], turns[i] = turns[i], turns[i - 1]
+    result = [face + SUFFIX_OF[n] for face, n in zip(faces, turns)]
+    if verify and CubeModel.from_moves(result).state != CubeModel.from_moves(moves).state:
+        raise Exception(f'Optimized moves {result} are not equivalent to {moves}.')
+    return result
@@ -0,0 +1,125 @@
+# ---------- Parallel IDA* (root split) ----------
+# Every IDA* iteration is split at split_depth: the parent process searches
+# the first moves itself and hands the remaining subtrees, one per move prefix,
+# to a process pool. Subtrees are numbered in the order the serial search
+# visits them. A worker that finds a solution publishes its number, and every
+# worker on a later subtree stops, so the result is the same path the serial
+# IdaStarSolver returns.
+
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+import multiprocessing
+import os
+import time
+
+from cube_model import CubeModel
+from ida_star_solver import IdaStarSolver
+from solver import SolveStats, SearchBudget, SearchCancelled
+
+NO_SOLUTION = 2 ** 31 - 1
+# How often the parent polls the budget while it waits for a subtree
+BUDGET_POLL_SECONDS = 0.05
+
+_worker_solver = None
+_first_solved = None
+_task_index = NO_SOLUTION
+
+def _init_worker(solver, first_solved):
+    global _worker_solver, _first_solved
+    _worker_solver = solver
+    _first_solved = first_solved
+    solver.should_stop = lambda: _task_index > _first_solved.value
+
+def _search_subtree(state, prefix, threshold, index):
+    global _task_index
+    _task_index = index
+    solver = _worker_solver
+    solver.stats = SolveStats()
+    cube = CubeModel()
+    cube.state = state
+    visited = set()
+    for move in prefix:
+        cube.move(move)
+        visited.add(cube.state)
+    path = list(prefix)
+    if index > _first_solved.value:
+        return None, None, solver.stats
+    try:
+        result = solver._search(cube, path, visited, threshold)
+    except SearchCancelled:
+        return None, None, solver.stats
+    if result is True:
+        with _first_solved.get_lock():
+            _first_solved.value = min(_first_solved.value, index)
+        return True, path, solver.stats
+    return result, None, solver.stats
+
+class ParallelIdaStarSolver(IdaStarSolver):
+    def __init__(self, max_depth=20, pattern_databases=None, canonical_moves=True, workers=None, split_depth=2):
+        super().__init__(max_depth, pattern_databases, canonical_moves=canonical_moves)
+        self.workers = workers or os.cpu_count()
+        self.split_depth = split_depth
+
+    def solve(self, start_cube: CubeModel, budget: SearchBudget = None) -> list:
+        self.stats = stats = SolveStats()
+        self.budget = budget
+        started = time.perf_counter()
+        cube = start_cube.clone()
+        threshold = self.heuristic(cube)
+        first_solved = multiprocessing.Value('i', NO_SOLUTION)
+        worker_solver = IdaStarSolver(self.max_depth, self.pattern_databases, canonical_moves=self.canonical_moves)
+        try:
+            with ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                     initargs=(worker_solver, first_solved)) as pool:
+                while threshold <= self.max_depth:
+                    stats.threshold = threshold
+                    path = []
+                    frontier = []
+                    result = self._search(cube, path, set(), threshold, frontier, self.split_depth)
+                    # A solution above the split comes after all collected subtrees
+                    shallow_solution = path.copy() if result is True else None
+                    first_solved.value = NO_SOLUTION
+                    futures = [pool.submit(_search_subtree, cube.state, prefix, threshold, i)
+                               for i, prefix in enumerate(frontier)]
+                    min_threshold = float('inf') if result is True else result
+                    solutions = {}
+                    for i, future in enumerate(futures):
+                        if i > first_solved.value:
+                            future.cancel()
+                        if future.cancelled():
+                            continue
+                        subtree_result, subtree_path, subtree_stats = self._wait(future, first_solved)
+                        self._add_stats(subtree_stats)
+                        if subtree_result is True:
+                            solutions[i] = subtree_path
+                        elif subtree_result is not None and subtree_result < min_threshold:
+                            min_threshold = subtree_result
+                    if solutions:
+                        stats.optimal = True
+                        return solutions[min(solutions)]
+                    if shallow_solution is not None:
+                        stats.optimal = True
+                        return shallow_solution
+                    if min_threshold == float('inf'):
+                        break
+                    threshold = min_threshold
+            return None
+        finally:
+            self.budget = None
+            stats.elapsed = time.perf_counter() - started
+
+    def _wait(self, future, first_solved):
+        # Result of a subtree search, polling the budget while the workers run
+        budget = self.budget
+        while True:
+            try:
+                return future.result(timeout=None if budget is None else BUDGET_POLL_SECONDS)
+            except TimeoutError:
+                if budget.exhausted(self.stats.nodes):
+                    # Every worker sees its subtree as a later one and stops
+                    first_solved.value = -1
+                    raise SearchCancelled()
+
+    def _add_stats(self, subtree_stats):
+        self.stats.nodes += subtree_stats.nodes
+        self.stats.expanded += subtree_stats.expanded
+        self.stats.generated += subtree_stats.generated
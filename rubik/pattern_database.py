@@ -0,0 +1,279 @@
+# ---------- Pattern databases (PDB) for IDA* ----------
+# A pattern tracks a subset of corner or edge cubies. Its database stores,
+# for every placement of those cubies, the exact number of moves needed to
+# bring them home, which is an admissible heuristic for the whole cube.
+#
+# Tables are built offline by a breadth-first search from the solved state
+# (python pattern_database.py [directory]) and stored nibble-packed: one
+# 4 bit distance per entry behind a small header. The solver reads them
+# through mmap, so loading is cheap and the pages are shared between processes.
+
+from math import perm
+from operator import itemgetter
+import logging
+import mmap
+import os
+import struct
+import sys
+
+import numpy as np
+
+from cube_model import SOLVED_STATE, MOVE_PERMUTATIONS
+
+# Facelet indices of every cubie slot, U/D (or F/B for middle edges) facelet first,
+# listed clockwise. Slot order: URF UFL ULB UBR DFR DLF DBL DRB
+CORNER_FACELETS = [
+    (8, 9, 20), (6, 18, 38), (0, 36, 47), (2, 45, 11),
+    (29, 26, 15), (27, 44, 24), (33, 53, 42), (35, 17, 51),
+]
+# Slot order: UR UF UL UB DR DF DL DB FR FL BL BR
+EDGE_FACELETS = [
+    (5, 10), (7, 19), (3, 37), (1, 46),
+    (32, 16), (28, 25), (30, 43), (34, 52),
+    (23, 12), (21, 41), (50, 39), (48, 14),
+]
+
+PDB_MAGIC = b'PDB1'
+PDB_HEADER = struct.Struct('<4sQ')
+UNSEEN = 0xF
+BFS_CHUNK_SIZE = 1 << 20
+
+PDB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pdb')
+
+class CubieSet:
+    # Corners or edges. A cubie's placement is coded as slot * orientations + twist,
+    # twist being the index of the cubie's first facelet within the slot's facelets.
+    def __init__(self, facelets):
+        self.facelets = facelets
+        self.num_of_slots = len(facelets)
+        self.num_of_orientations = len(facelets[0])
+        o = self.num_of_orientations
+        # Colors of a slot's facelets read in one call
+        self.slot_readers = [itemgetter(*fs) for fs in facelets]
+        # Colors read from a slot -> (cubie, twist)
+        self.readings = {}
+        for cubie, fs in enumerate(facelets):
+            colors = [SOLVED_STATE[f] for f in fs]
+            for twist in range(o):
+                reading = [0] * o
+                for j in range(o):
+                    reading[(twist + j) % o] = colors[j]
+                self.readings[tuple(reading)] = (cubie, twist)
+        # Move token -> placement code transitions
+        code_of_facelet = {f: slot * o + k for slot, fs in enumerate(facelets) for k, f in enumerate(fs)}
+        self.code_moves = {}
+        for token, p in MOVE_PERMUTATIONS.items():
+            destination = [0] * len(p)
+            for i, j in enumerate(p):
+                destination[j] = i
+            self.code_moves[token] = np.array(
+                [code_of_facelet[destination[f]] for fs in facelets for f in fs], dtype=np.int64)
+
+    def placements(self, state):
+        # (slot, twist) of every cubie in a sticker state
+        readings = self.readings
+        result = [None] * self.num_of_slots
+        for slot, read in enumerate(self.slot_readers):
+            cubie, twist = readings[read(state)]
+            result[cubie] = (slot, twist)
+        return result
+
+CORNERS = CubieSet(CORNER_FACELETS)
+EDGES = CubieSet(EDGE_FACELETS)
+
+class Pattern:
+    def __init__(self, name, cubie_set, cubies):
+        self.name = name
+        self.cubie_set = cubie_set
+        self.cubies = list(cubies)
+        n = len(self.cubies)
+        slots = cubie_set.num_of_slots
+        o = cubie_set.num_of_orientations
+        # With every cubie tracked the last twist follows from the others
+        self.num_of_free_twists = n - 1 if n == slots else n
+        self.num_of_twists = o ** self.num_of_free_twists
+        self.weights = [perm(slots - 1 - i, n - 1 - i) for i in range(n)]
+        self.size = perm(slots, n) * self.num_of_twists
+
+    def index(self, state):
+        return self.placement_index(self.cubie_set.placements(state))
+
+    def placement_index(self, placements):
+        # Index of the (slot, twist) placements of the whole cubie set
+        o = self.cubie_set.num_of_orientations
+        rank = 0
+        used = 0
+        twists = 0
+        for i, cubie in enumerate(self.cubies):
+            slot, twist = placements[cubie]
+            rank += (slot - (used & ((1 << slot) - 1)).bit_count()) * self.weights[i]
+            used |= 1 << slot
+            if i < self.num_of_free_twists:
+                twists = twists * o + twist
+        return rank * self.num_of_twists + twists
+
+    # ---- Vectorized coding used by the generator ----
+
+    def encode(self, codes):
+        o = self.cubie_set.num_of_orientations
+        slots, twists = np.divmod(codes, o)
+        rank = np.zeros(len(codes), dtype=np.int64)
+        for i in range(len(self.cubies)):
+            smaller = slots[:, i].copy()
+            for j in range(i):
+                smaller -= slots[:, j] < slots[:, i]
+            rank += smaller * self.weights[i]
+        twist_index = np.zeros(len(codes), dtype=np.int64)
+        for i in range(self.num_of_free_twists):
+            twist_index = twist_index * o + twists[:, i]
+        return rank * self.num_of_twists + twist_index
+
+    def decode(self, indices):
+        o = self.cubie_set.num_of_orientations
+        n = len(self.cubies)
+        count = len(indices)
+        rank, twist_index = np.divmod(indices, self.num_of_twists)
+        twists = np.zeros((count, n), dtype=np.int64)
+        for i in reversed(range(self.num_of_free_twists)):
+            twist_index, twists[:, i] = np.divmod(twist_index, o)
+        if self.num_of_free_twists < n:
+            twists[:, n - 1] = -twists[:, :n - 1].sum(axis=1) % o
+        slots = np.zeros((count, n), dtype=np.int64)
+        free = np.ones((count, self.cubie_set.num_of_slots), dtype=bool)
+        rows = np.arange(count)
+        for i in range(n):
+            digit, rank = np.divmod(rank, self.weights[i])
+            nth_free = np.cumsum(free, axis=1) - 1
+            slots[:, i] = np.argmax(free & (nth_free == digit[:, None]), axis=1)
+            free[rows, slots[:, i]] = False
+        return slots * o + twists
+
+def generate_pattern_database(pattern, path):
+    write_pattern_database(pattern_depths(pattern), path)
+
+def pattern_move_tables(pattern):
+    # A move turns every cubie's twist by an amount that only depends on its
+    # slot, so with index = rank * num_of_twists + twists a child index is
+    #   rank_moves[m][rank] * num_of_twists + twist_sums[twists, twist_moves[m][rank]]
+    # with the twist change of the rank read from its move from zero twists.
+    o = pattern.cubie_set.num_of_orientations
+    n = pattern.num_of_twists
+    moves = list(pattern.cubie_set.code_moves.values())
+    num_of_ranks = pattern.size // n
+    rank_moves = np.empty((len(moves), num_of_ranks), dtype=np.int32)
+    twist_moves = np.empty((len(moves), num_of_ranks), dtype=np.int32)
+    for start in range(0, num_of_ranks, BFS_CHUNK_SIZE):
+        stop = min(start + BFS_CHUNK_SIZE, num_of_ranks)
+        codes = pattern.decode(np.arange(start, stop, dtype=np.int64) * n)
+        for m, code_move in enumerate(moves):
+            rank_moves[m, start:stop], twist_moves[m, start:stop] = np.divmod(
+                pattern.encode(code_move[codes]), n)
+    # Digit by digit sum (mod o) of two twist indices
+    digits = np.zeros((n, pattern.num_of_free_twists), dtype=np.int64)
+    twist_index = np.arange(n)
+    for i in reversed(range(pattern.num_of_free_twists)):
+        twist_index, digits[:, i] = np.divmod(twist_index, o)
+    twist_sums = np.zeros((n, n), dtype=np.int64)
+    for i in range(pattern.num_of_free_twists):
+        twist_sums = twist_sums * o + (digits[:, None, i] + digits[None, :, i]) % o
+    return rank_moves, twist_moves, twist_sums
+
+def pattern_depths(pattern):
+    # Breadth-first search over the pattern's placements, starting from solved.
+    # The depth table is the visited set: every level is found again by scanning
+    # the table in BFS_CHUNK_SIZE slices, so memory stays at one byte per
+    # placement plus the move tables and one chunk. Once fewer placements are
+    # unseen than in the frontier, the unseen ones look for a parent instead
+    # (every move's inverse is a move too).
+    o = pattern.cubie_set.num_of_orientations
+    n = np.int64(pattern.num_of_twists)
+    rank_moves, twist_moves, twist_sums = pattern_move_tables(pattern)
+    twist_sums = twist_sums.ravel()
+    depths = np.full(pattern.size, UNSEEN, dtype=np.uint8)
+    solved = np.array([[cubie * o for cubie in pattern.cubies]], dtype=np.int64)
+    depths[pattern.encode(solved)] = 0
+    depth = 0
+    frontier_size = 1
+    unseen_size = pattern.size - 1
+    while frontier_size:
+        backward = unseen_size < frontier_size
+        for start in range(0, pattern.size, BFS_CHUNK_SIZE):
+            chunk = depths[start:start + BFS_CHUNK_SIZE]
+            indices = start + np.flatnonzero(chunk == (UNSEEN if backward else depth))
+            if not indices.size:
+                continue
+            rank, twists = np.divmod(indices, n)
+            twists *= n
+            found = np.zeros(indices.size, dtype=bool)
+            for rank_move, twist_move in zip(rank_moves, twist_moves):
+                child = rank_move[rank] * n + twist_sums[twists + twist_move[rank]]
+                if backward:
+                    found |= depths[child] == depth
+                else:
+                    depths[child[depths[child] == UNSEEN]] = depth + 1
+            if backward:
+                depths[indices[found]] = depth + 1
+        depth += 1
+        frontier_size = sum(int(np.count_nonzero(depths[start:start + BFS_CHUNK_SIZE] == depth))
+                            for start in range(0, pattern.size, BFS_CHUNK_SIZE))
+        unseen_size -= frontier_size
+        logging.info('Pattern %s: %d placements at depth %d', pattern.name, frontier_size, depth)
+    return depths
+
+def write_pattern_database(depths, path):
+    size = depths.size
+    if size % 2:
+        depths = np.append(depths, np.uint8(UNSEEN))
+    packed = depths[0::2] | (depths[1::2] << 4)
+    with open(path, 'wb') as f:
+        f.write(PDB_HEADER.pack(PDB_MAGIC, size))
+        f.write(packed.tobytes())
+
+class PatternDatabase:
+    def __init__(self, pattern, path):
+        self.pattern = pattern
+        self.path = path
+        with open(path, 'rb') as f:
+            self._table = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, size = PDB_HEADER.unpack_from(self._table)
+        if magic != PDB_MAGIC or size != pattern.size:
+            raise Exception(f'{path} is not a pattern database for {pattern.name}.')
+
+    def lookup(self, state):
+        return self.lookup_placements(self.pattern.cubie_set.placements(state))
+
+    def lookup_placements(self, placements):
+        # Depth for placements of the pattern's cubie set, so databases over the
+        # same set can share one CubieSet.placements() call per state
+        i = self.pattern.placement_index(placements)
+        return (self._table[PDB_HEADER.size + (i >> 1)] >> ((i & 1) << 2)) & 0xF
+
+    def close(self):
+        self._table.close()
+
+    def __reduce__(self):
+        # Other processes map the same file instead of copying the table
+        return (PatternDatabase, (self.pattern, self.path))
+
+DEFAULT_PATTERNS = [
+    Pattern('corners', CORNERS, range(8)),
+    Pattern('edges_a', EDGES, range(0, 6)),
+    Pattern('edges_b', EDGES, range(6, 12)),
+]
+
+def pattern_database_path(pattern, directory=PDB_DIR):
+    return os.path.join(directory, pattern.name + '.pdb')
+
+def load_pattern_databases(patterns=DEFAULT_PATTERNS, directory=PDB_DIR):
+    # All databases of the patterns, or [] when any of the table files is missing
+    paths = [pattern_database_path(pattern, directory) for pattern in patterns]
+    if not all(os.path.exists(path) for path in paths):
+        return []
+    return [PatternDatabase(pattern, path) for pattern, path in zip(patterns, paths)]
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    directory = sys.argv[1] if len(sys.argv) > 1 else PDB_DIR
+    os.makedirs(directory, exist_ok=True)
+    for pattern in DEFAULT_PATTERNS:
+        generate_pattern_database(pattern, pattern_database_path(pattern, directory))
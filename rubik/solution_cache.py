@@ -0,0 +1,145 @@
+# ---------- Solution cache with symmetry reduction ----------
+# States that differ only by a whole-cube rotation or reflection need the same
+# number of moves. The cache maps every state to a canonical representative
+# (the smallest of its 48 symmetric images), solves and stores only that one,
+# and translates the cached moves back to the orientation that was asked for.
+#
+# A symmetry is an orthogonal 3x3 matrix M acting on sticker positions. It
+# moves a sticker from p to M p and relabels its color by the face that
+# M turns the original face into. Face turns are mapped the same way; mirror
+# images (det M = -1) also reverse the turning direction.
+
+from collections import OrderedDict
+from itertools import permutations, product
+from operator import itemgetter
+import shelve
+
+from cube_model import CubeModel
+from solver import Solver, SolveStats, SearchBudget
+
+FACE_NORMALS = {
+    'U': (0, 1, 0), 'R': (1, 0, 0), 'F': (0, 0, 1),
+    'D': (0, -1, 0), 'L': (-1, 0, 0), 'B': (0, 0, -1),
+}
+# Direction of increasing column and row of every face in the facelet layout
+FACE_AXES = {
+    'U': ((1, 0, 0), (0, 0, 1)),
+    'R': ((0, 0, -1), (0, -1, 0)),
+    'F': ((1, 0, 0), (0, -1, 0)),
+    'D': ((1, 0, 0), (0, 0, -1)),
+    'L': ((0, 0, 1), (0, -1, 0)),
+    'B': ((-1, 0, 0), (0, -1, 0)),
+}
+FACES = 'URFDLB'
+
+def sticker_positions():
+    # Doubled 3D coordinates of the 54 stickers, in state order
+    positions = []
+    for face in FACES:
+        normal = FACE_NORMALS[face]
+        right, down = FACE_AXES[face]
+        for i in range(9):
+            row, col = divmod(i, 3)
+            positions.append(tuple(3 * n + 2 * (col - 1) * r + 2 * (row - 1) * d
+                                   for n, r, d in zip(normal, right, down)))
+    return positions
+
+def _transform(matrix, v):
+    return tuple(sum(m * x for m, x in zip(row, v)) for row in matrix)
+
+def _determinant(m):
+    return (m[0][0] * (m[1][1] * m[2][2] - m[1][2] * m[2][1])
+            - m[0][1] * (m[1][0] * m[2][2] - m[1][2] * m[2][0])
+            + m[0][2] * (m[1][0] * m[2][1] - m[1][1] * m[2][0]))
+
+def symmetry_matrices():
+    # All 48 signed permutation matrices, identity first
+    matrices = []
+    for axes in permutations(range(3)):
+        for signs in product((1, -1), repeat=3):
+            matrices.append(tuple(tuple(signs[i] if j == axes[i] else 0 for j in range(3)) for i in range(3)))
+    return sorted(matrices, reverse=True)
+
+class Symmetry:
+    def __init__(self, matrix):
+        positions = sticker_positions()
+        index_of = {p: i for i, p in enumerate(positions)}
+        face_of = {normal: face for face, normal in FACE_NORMALS.items()}
+        self.matrix = matrix
+        self.mirror = _determinant(matrix) < 0
+        self.faces = {face: face_of[_transform(matrix, normal)] for face, normal in FACE_NORMALS.items()}
+        # new_state[destination[i]] = colors[state[i]]
+        destination = [index_of[_transform(matrix, p)] for p in positions]
+        source = [0] * len(destination)
+        for i, j in enumerate(destination):
+            source[j] = i
+        self._getter = itemgetter(*source)
+        self._colors = bytes.maketrans(FACES.encode('ascii'),
+                                       ''.join(self.faces[f] for f in FACES).encode('ascii'))
+        self.moves = {}
+        for face in FACES:
+            image = self.faces[face]
+            for suffix, image_suffix in (('', "'" if self.mirror else ''), ("'", '' if self.mirror else "'"), ('2', '2')):
+                self.moves[face + suffix] = image + image_suffix
+        self.inverse_moves = {image: token for token, image in self.moves.items()}
+
+    def apply(self, state):
+        return bytes(self._getter(state)).translate(self._colors)
+
+SYMMETRIES = [Symmetry(m) for m in symmetry_matrices()]
+
+def canonical_form(state):
+    # (representative state, symmetry that maps state onto it)
+    return min(((s.apply(state), s) for s in SYMMETRIES), key=lambda pair: pair[0])
+
+class SolutionCache(Solver):
+    # LRU cache of solutions in front of another solver, optionally backed by
+    # a shelve file that persists solutions between runs.
+    def __init__(self, solver: Solver, max_entries=10000, path=None):
+        self.solver = solver
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.store = shelve.open(path) if path else None
+        self.stats = SolveStats()
+        self.hits = 0
+        self.store_hits = 0
+        self.misses = 0
+
+    def hit_rate(self):
+        lookups = self.hits + self.store_hits + self.misses
+        return (self.hits + self.store_hits) / lookups if lookups else 0.0
+
+    def solve(self, cube: CubeModel, budget: SearchBudget = None) -> list:
+        representative, symmetry = canonical_form(cube.state)
+        key = representative.decode('ascii')
+        solution = self.entries.get(key)
+        if solution is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            self.stats = SolveStats()
+        elif self.store is not None and key in self.store:
+            self.store_hits += 1
+            solution = self.store[key]
+            self._remember(key, solution)
+            self.stats = SolveStats()
+        else:
+            self.misses += 1
+            representative_cube = CubeModel()
+            representative_cube.state = representative
+            solution = self.solver.solve(representative_cube, budget)
+            self.stats = self.solver.stats
+            if solution is None:
+                return None
+            self._remember(key, solution)
+            if self.store is not None:
+                self.store[key] = solution
+        return [symmetry.inverse_moves[m] for m in solution]
+
+    def _remember(self, key, solution):
+        self.entries[key] = solution
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
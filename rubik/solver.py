@@ -1,7 +1,54 @@
 from abc import ABC, abstractmethod
 from cube_model import CubeModel
+import time
+
+class SearchCancelled(Exception):
+    pass
+
+class CancellationToken:
+    # Shared flag: a caller (e.g. the UI thread) sets it to stop a running solve
+    def __init__(self):
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+class SearchBudget:
+    # Deadline (seconds from now), node limit and cancellation token of one
+    # solve() call. Searches poll exhausted() and raise SearchCancelled.
+    def __init__(self, timeout=None, max_nodes=None, token=None):
+        self.deadline = None if timeout is None else time.perf_counter() + timeout
+        self.max_nodes = max_nodes
+        self.token = token
+
+    def cancelled(self):
+        return self.token is not None and self.token.cancelled
+
+    def exhausted(self, nodes):
+        return (self.cancelled()
+                or (self.max_nodes is not None and nodes >= self.max_nodes)
+                or (self.deadline is not None and time.perf_counter() >= self.deadline))
+
+class SolveStats:
+    # Search counters of the last solve() call
+    def __init__(self):
+        self.nodes = 0
+        self.expanded = 0
+        self.generated = 0
+        self.elapsed = 0.0
+        # Bound of the running iteration (IDA* threshold), for progress reports
+        self.threshold = 0
+        # True when the solution is known to be the shortest one
+        self.optimal = False
+
+    def nodes_per_second(self):
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+    def branching_factor(self):
+        # Average number of children generated per expanded node
+        return self.generated / self.expanded if self.expanded else 0.0
 
 class Solver(ABC):
     @abstractmethod
-    def solve(self, cube: CubeModel) -> list:
+    def solve(self, cube: CubeModel, budget: SearchBudget = None) -> list:
         pass
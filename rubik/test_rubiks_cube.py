@@ -1,11 +1,42 @@
 import unittest
 from unittest.mock import MagicMock
+import os
 import sys
+import tempfile
+import io
+import numpy as np
 sys.modules['ui'] = MagicMock()
 
-from cube_view import Cube, play_moves, MOVE_MAP
+class FakeView:
+    # Stands in for ui.View, so RubiksCubeView is a real class in the tests
+    width = 400
+    height = 600
+
+    def add_subview(self, view):
+        pass
+
+    def set_needs_display(self):
+        pass
+
+sys.modules['ui'].View = FakeView
+
+from cube_view import Cube, RubiksCubeView, play_moves, MOVE_MAP, FACE_COLOR_INNER
 from cube_model import CubeModel
 from ida_star_solver import IdaStarSolver
+from pattern_database import (Pattern, PatternDatabase, CORNERS, EDGES,
+    generate_pattern_database)
+from two_phase_solver import TwoPhaseSolver, TablesNotFound, generate_tables
+from transposition_table import TranspositionTable
+from parallel_ida_star_solver import ParallelIdaStarSolver
+from batch_solver import solve_batch, BatchSummary, percentile
+from solution_cache import SolutionCache, SYMMETRIES
+from bidirectional_solver import BidirectionalSolver, state_word, MOVE_INDEX
+from cube_batch import CubeBatch, MOVE_TOKENS
+from beginner_solver import BeginnerSolver
+from move_optimizer import optimize_moves
+from anytime_solver import AnytimeSolver
+from solver import Solver, SolveStats, SearchBudget, SearchCancelled, CancellationToken
+from frame_profiler import FrameProfiler, STAGES
 
 class CubeTestCase(unittest.TestCase):
     def test_default_model_state(self):
@@ -103,6 +134,16 @@ class CubeTestCase(unittest.TestCase):
         self.assertEqual(cube.logic.as_string(),
             'LLLUUUUUU;RRURRURRU;FFFFFFFFF;DDDDDDRRR;DLLDLLDLL;BBBBBBBBB')
 
+    def test_model_after_U_B(self):
+        # After U the L column is no longer one color, B must keep its order
+        cube = Cube()
+        moves = ['U', 'B']
+
+        play_moves(cube, moves)
+
+        self.assertEqual(cube.logic.as_string(),
+            'BRRUUUUUU;BBDRRDRRD;RRRFFFFFF;DDDDDDFLL;UFFULLULL;BBLBBLBBL')
+
     def test_model_after_F(self):
         cube = Cube()
         moves = ['F']
@@ -131,6 +172,26 @@ class CubeTestCase(unittest.TestCase):
         
         self.assertEqual(cube_model.as_string(), 'BUUBUUDUU;BBBURRURR;LRRLFFLFF;URRFDDFDD;LLFLLFDDF;LLDBBDBBR')
 
+    def test_cube_model_state_is_compact(self):
+        cube_model = CubeModel.from_string('BUUBUUDUU;BBBURRURR;LRRLFFLFF;URRFDDFDD;LLFLLFDDF;LLDBBDBBR')
+
+        self.assertIsInstance(cube_model.state, bytes)
+        self.assertEqual(cube_model.state, b'BUUBUUDUUBBBURRURRLRRLFFLFFURRFDDFDDLLFLLFDDFLLDBBDBBR')
+
+    def test_cube_model_quarter_turn_four_times(self):
+        for face in 'URFDLB':
+            cube_model = CubeModel.from_moves([face] * 4)
+
+            self.assertTrue(cube_model.is_solved())
+            self.assertEqual(cube_model.as_string(), CubeModel().as_string())
+
+    def test_cube_model_composed_moves(self):
+        for face in 'URFDLB':
+            self.assertEqual(CubeModel.from_moves([face + "'"]).as_string(),
+                CubeModel.from_moves([face] * 3).as_string())
+            self.assertEqual(CubeModel.from_moves([face + '2']).as_string(),
+                CubeModel.from_moves([face] * 2).as_string())
+
     def test_move_map_U(self):
         move = 'U'
         cube = Cube()
@@ -297,5 +358,593 @@ class CubeTestCase(unittest.TestCase):
         cube_model.apply(solution)
         self.assertTrue(cube_model.is_solved())
 
+    def test_solve_does_not_modify_cube_and_counts_nodes(self):
+        cube_model = CubeModel.from_moves(["R", "U", "F"])
+        scrambled = cube_model.as_string()
+        solver = IdaStarSolver()
+
+        solver.solve(cube_model)
+
+        self.assertEqual(cube_model.as_string(), scrambled)
+        self.assertGreater(solver.stats.nodes, 0)
+        self.assertGreater(solver.stats.nodes_per_second(), 0)
+    def test_canonical_moves_reduce_branching(self):
+        cube_model = CubeModel.from_moves(["U", "D", "F", "B", "L", "R"])
+        canonical = IdaStarSolver()
+        same_face = IdaStarSolver(canonical_moves=False)
+
+        solution = canonical.solve(cube_model)
+
+        self.assertListEqual(solution, same_face.solve(cube_model))
+        self.assertLess(canonical.stats.nodes, same_face.stats.nodes)
+        self.assertLess(canonical.stats.branching_factor(), same_face.stats.branching_factor())
+
+    def test_instant_playback_matches_animation(self):
+        moves = ["R", "U2", "F'", "L", "D", "B2", "R'", "U"]
+        animated = Cube()
+        instant = Cube()
+        for cube in (animated, instant):
+            cube.rotate_cube('y', 3.75)
+            cube.rotate_cube('x', -0.44)
+
+        play_moves(animated, moves, instant=False)
+        play_moves(instant, moves)
+
+        self.assertEqual(instant.logic.state, animated.logic.state)
+        self.assertEqual(instant.logic.state, CubeModel.from_moves(moves).state)
+        self.assertTrue(np.array_equal(instant.cubelets.centers, animated.cubelets.centers))
+        self.assertTrue(np.array_equal(instant.cubelets.rotations, animated.cubelets.rotations))
+
+    def test_instant_playback_of_move_without_token(self):
+        # Middle slice: turns the cubelets, the logic model has no such move
+        cube = Cube()
+        cube._move_queue.append(('x', 0, 90))
+
+        cube._play_instantly()
+
+        self.assertTrue(cube.logic.is_solved())
+        self.assertFalse(cube._move_queue)
+
+    def test_slice_members(self):
+        cube = Cube()
+        cube.rotate_cube('y', 0.7)
+
+        for axis in ['x', 'y', 'z']:
+            for layer in [-1, 0, 1]:
+                members = cube.slice_members(axis, layer)
+                self.assertEqual(len(members), 9)
+                self.assertTrue((cube.cubelets.grid_pos[members, ['x', 'y', 'z'].index(axis)] == layer).all())
+
+    def test_parallel_solve_matches_serial(self):
+        for moves in (["U"], ["R", "U", "F"], ["U'", "D", "F'", "B'", "L", "R'"]):
+            cube_model = CubeModel.from_moves(moves)
+
+            solution = ParallelIdaStarSolver(workers=2).solve(cube_model)
+
+            self.assertListEqual(solution, IdaStarSolver().solve(cube_model))
+
+    def test_solve_with_transposition_table(self):
+        cube_model = CubeModel.from_moves(["U'", "D", "F'", "B'", "L", "R'"])
+        table = TranspositionTable(max_bytes=1024 * 1024)
+        solver = IdaStarSolver(transposition_table=table)
+
+        solution = solver.solve(cube_model)
+
+        self.assertListEqual(solution, ['R', "L'", 'F', 'B', 'U', "D'"])
+        self.assertGreater(table.stores, 0)
+        self.assertGreater(table.hits, 0)
+
+    def test_transposition_table_resumes_cancelled_solve(self):
+        cube_model = CubeModel.from_moves(["U'", "D", "F'", "B'", "L", "R'"])
+        plain = IdaStarSolver()
+        plain.solve(cube_model)
+        budget_nodes = plain.stats.nodes // 4
+        solver = IdaStarSolver(transposition_table=TranspositionTable(max_bytes=1024 * 1024))
+
+        with self.assertRaises(SearchCancelled):
+            solver.solve(cube_model, SearchBudget(max_nodes=budget_nodes))
+        solution = None
+        for _ in range(5):
+            try:
+                solution = solver.solve(cube_model, SearchBudget(max_nodes=budget_nodes))
+                break
+            except SearchCancelled:
+                pass
+
+        self.assertListEqual(solution, ['R', "L'", 'F', 'B', 'U', "D'"])
+
+    def test_transposition_table_keeps_deeper_entry(self):
+        table = TranspositionTable(max_bytes=11)
+
+        table.put(1, 5, 7)
+        table.put(2, 3, 2)
+
+        self.assertEqual(table.size, 1)
+        self.assertEqual(table.get(1), 5)
+        self.assertEqual(table.get(2), 0)
+        table.new_generation()
+        table.put(2, 3, 2)
+        self.assertEqual(table.get(2), 3)
+        self.assertEqual(table.evictions, 1)
+
+class CubeBatchTestCase(unittest.TestCase):
+    def test_batch_moves_match_cube_model(self):
+        scrambles = [[MOVE_TOKENS[(i * 7 + j * 5) % 18] for j in range(8)] for i in range(18)]
+        batch = CubeBatch.solved(len(scrambles))
+
+        for j in range(8):
+            batch.move_each([MOVE_TOKENS.index(s[j]) for s in scrambles])
+
+        for i, scramble in enumerate(scrambles):
+            self.assertEqual(batch[i].state, CubeModel.from_moves(scramble).state)
+
+    def test_apply_equals_and_is_solved(self):
+        cube_model = CubeModel.from_moves(["R", "U", "F'"])
+        batch = CubeBatch.from_models([CubeModel(), cube_model])
+        solved = CubeBatch.solved(2)
+
+        self.assertListEqual(batch.is_solved().tolist(), [True, False])
+        self.assertListEqual(batch.equals(cube_model).tolist(), [False, True])
+        solved.apply(["R", "U", "F'"])
+        solved.move("L2")
+        cube_model.move("L2")
+        self.assertListEqual(solved.equals(cube_model).tolist(), [True, True])
+        solved.apply(["L2", "F", "U'", "R'"])
+        self.assertTrue(solved.is_solved().all())
+
+class MoveOptimizerTestCase(unittest.TestCase):
+    def test_cancel_merge_and_commute(self):
+        self.assertListEqual(optimize_moves(["U", "U'"]), [])
+        self.assertListEqual(optimize_moves(["U", "U", "U"]), ["U'"])
+        self.assertListEqual(optimize_moves(["R", "L", "R'"]), ["L"])
+        self.assertListEqual(optimize_moves(["D", "U2", "D"]), ["U2", "D2"])
+        self.assertListEqual(optimize_moves(["R", "U", "U'", "R'", "F"]), ["F"])
+        self.assertListEqual(optimize_moves(["R", "U", "F"]), ["R", "U", "F"])
+
+    def test_verify_equivalence(self):
+        moves = [MOVE_TOKENS[(i * i + 3 * i) % 18] for i in range(40)]
+
+        optimized = optimize_moves(moves, verify=True)
+
+        self.assertLess(len(optimized), len(moves))
+        self.assertListEqual(optimize_moves(optimized), optimized)
+
+class BeginnerSolverTestCase(unittest.TestCase):
+    def test_solve_scrambles(self):
+        solver = BeginnerSolver()
+        for moves in ([], ["U"], ["R", "U", "F"], ["U'", "D", "F'", "B'", "L", "R'"],
+                      [MOVE_TOKENS[(i * 11) % 18] for i in range(30)]):
+            cube_model = CubeModel.from_moves(moves)
+
+            solution = solver.solve(cube_model)
+
+            self.assertEqual(cube_model.state, CubeModel.from_moves(moves).state)
+            cube_model.apply(solution)
+            self.assertTrue(cube_model.is_solved())
+            phases = [phase for phase, _, _ in solver.phase_stats]
+            self.assertListEqual(phases, ['white cross', 'white corners', 'second layer', 'oll', 'pll'])
+            self.assertGreaterEqual(sum(length for _, length, _ in solver.phase_stats), len(solution))
+
+class BidirectionalSolverTestCase(unittest.TestCase):
+    def test_solution_is_optimal(self):
+        solver = BidirectionalSolver()
+        for moves in (["U"], ["R", "U", "F"], ["U'", "D", "F'", "B'", "L", "R'"]):
+            cube_model = CubeModel.from_moves(moves)
+
+            solution = solver.solve(cube_model)
+
+            self.assertEqual(len(solution), len(moves))
+            cube_model.apply(solution)
+            self.assertTrue(cube_model.is_solved())
+
+    def test_frontier_depth_follows_memory_budget(self):
+        small = BidirectionalSolver(max_bytes=64 * 1024)
+        small.build_frontier()
+        cube_model = CubeModel.from_moves(["R", "U", "F", "L", "D"])
+
+        solution = small.solve(cube_model)
+
+        self.assertEqual(small.backward_depth, 2)
+        self.assertEqual(small.frontier_size, 1 + 18 + 243)
+        self.assertLessEqual(len(small.frontier) * small.frontier.itemsize, 64 * 1024)
+        cube_model.apply(solution)
+        self.assertTrue(cube_model.is_solved())
+        self.assertEqual(len(solution), 5)
+
+    def test_hash_collision_is_not_a_meeting(self):
+        solver = BidirectionalSolver(max_bytes=64 * 1024)
+        solver.build_frontier()
+        # A word for a state 3 moves away, as if its hash had collided
+        state = CubeModel.from_moves(["R", "U", "F"]).state
+        solver._insert(state_word(state) | MOVE_INDEX["F"])
+
+        self.assertIsNone(solver._backward_path(state, solver._lookup(state)))
+
+class SolutionCacheTestCase(unittest.TestCase):
+    def test_symmetries_commute_with_moves(self):
+        state = CubeModel.from_moves(["R", "U", "F'", "L2", "B"]).state
+
+        for symmetry in SYMMETRIES:
+            for move in ["U", "R'", "F2", "B"]:
+                moved = CubeModel()
+                moved.state = state
+                moved.move(move)
+                image = CubeModel()
+                image.state = symmetry.apply(state)
+                image.move(symmetry.moves[move])
+                self.assertEqual(symmetry.apply(moved.state), image.state)
+
+    def test_symmetric_states_share_solution(self):
+        cache = SolutionCache(IdaStarSolver())
+        cube_model = CubeModel.from_moves(["R", "U", "F"])
+        mirrored = CubeModel()
+        mirrored.state = SYMMETRIES[-1].apply(cube_model.state)
+
+        solution = cache.solve(cube_model)
+        mirrored_solution = cache.solve(mirrored)
+
+        self.assertEqual((cache.misses, cache.hits), (1, 1))
+        cube_model.apply(solution)
+        mirrored.apply(mirrored_solution)
+        self.assertTrue(cube_model.is_solved())
+        self.assertTrue(mirrored.is_solved())
+        self.assertEqual(len(mirrored_solution), 3)
+
+    def test_lru_eviction_and_persistent_store(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'solutions')
+            cache = SolutionCache(IdaStarSolver(), max_entries=1, path=path)
+            cache.solve(CubeModel.from_moves(["R"]))
+            cache.solve(CubeModel.from_moves(["R", "U"]))
+            cache.solve(CubeModel.from_moves(["R"]))
+            cache.close()
+
+            self.assertEqual(len(cache.entries), 1)
+            self.assertEqual((cache.misses, cache.store_hits, cache.hits), (2, 1, 0))
+
+            reopened = SolutionCache(IdaStarSolver(), path=path)
+            solution = reopened.solve(CubeModel.from_moves(["U"]))
+            reopened.close()
+
+            self.assertListEqual(solution, ["U'"])
+            self.assertEqual(reopened.store_hits, 1)
+            self.assertEqual(reopened.hit_rate(), 1.0)
+
+class BatchSolverTestCase(unittest.TestCase):
+    def test_solve_batch(self):
+        states = [
+            CubeModel.from_moves(["U"]).as_string() + '\n',
+            CubeModel.from_moves(["R", "U", "F"]).as_string() + '\n',
+            'not a cube\n',
+        ]
+        summary = BatchSummary()
+
+        records = list(solve_batch(states, IdaStarSolver(), workers=2))
+        for record in records:
+            summary.add(record)
+
+        self.assertListEqual([r['state'] for r in records], [s.strip() for s in states])
+        self.assertListEqual(records[0]['solution'], ["U'"])
+        self.assertEqual(records[1]['length'], 3)
+        self.assertGreater(records[1]['nodes'], 0)
+        self.assertIn('error', records[2])
+        result = summary.as_dict()
+        self.assertEqual(result['cubes'], 3)
+        self.assertEqual(result['failed'], 1)
+        self.assertGreater(result['cubes_per_second'], 0)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([], 50), 0.0)
+
+class PatternDatabaseTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.pattern = Pattern('test_corners', CORNERS, range(3))
+        path = os.path.join(self.tmp_dir.name, 'test_corners.pdb')
+        generate_pattern_database(self.pattern, path)
+        self.db = PatternDatabase(self.pattern, path)
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp_dir.cleanup()
+
+    def test_cubies_stay_intact(self):
+        cube_model = CubeModel.from_moves(["U", "B", "R'", "D2", "L", "F'", "B2"])
+
+        corners = CORNERS.placements(cube_model.state)
+        edges = EDGES.placements(cube_model.state)
+
+        self.assertEqual(sorted(slot for slot, _ in corners), list(range(8)))
+        self.assertEqual(sorted(slot for slot, _ in edges), list(range(12)))
+        self.assertEqual(sum(twist for _, twist in corners) % 3, 0)
+        self.assertEqual(sum(twist for _, twist in edges) % 2, 0)
+
+    def test_lookup_is_admissible(self):
+        self.assertEqual(self.db.lookup(CubeModel().state), 0)
+        self.assertEqual(self.db.lookup(CubeModel.from_moves(["R"]).state), 1)
+        self.assertLessEqual(self.db.lookup(CubeModel.from_moves(["R", "U", "F", "L"]).state), 4)
+
+    def test_index_matches_generator_encoding(self):
+        moves = ["R", "U", "F'", "D2", "B"]
+        codes = [[cubie * 3 for cubie in self.pattern.cubies]]
+        for move in moves:
+            codes = CORNERS.code_moves[move][codes]
+
+        self.assertEqual(self.pattern.index(CubeModel.from_moves(moves).state),
+            self.pattern.encode(codes)[0])
+
+    def test_solve_with_pattern_database(self):
+        cube_model = CubeModel.from_moves(["R", "U", "F", "L"])
+        solver = IdaStarSolver(pattern_databases=[self.db])
+
+        solution = solver.solve(cube_model)
+
+        self.assertListEqual(solution, ["L'", "F'", "U'", "R'"])
+
+    def test_heuristic_is_max_of_lookups(self):
+        pattern = Pattern('test_corners_b', CORNERS, range(3, 6))
+        path = os.path.join(self.tmp_dir.name, 'test_corners_b.pdb')
+        generate_pattern_database(pattern, path)
+        other_db = PatternDatabase(pattern, path)
+        solver = IdaStarSolver(pattern_databases=[self.db, other_db])
+
+        for moves in (["R"], ["R", "U", "F", "L"], ["U", "B", "R'", "D2", "L", "F'", "B2"]):
+            state = CubeModel.from_moves(moves).state
+            self.assertEqual(solver.heuristic(CubeModel.from_moves(moves)),
+                max(self.db.lookup(state), other_db.lookup(state)))
+        other_db.close()
+
+class TwoPhaseSolverTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Tables are built once for the test case, outside the source tree
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        generate_tables(cls.tmp_dir.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp_dir.cleanup()
+
+    def test_solve_when_already_solved(self):
+        solver = TwoPhaseSolver(table_dir=self.tmp_dir.name)
+
+        self.assertListEqual(solver.solve(CubeModel()), [])
+
+    def test_solve_scrambled(self):
+        scramble = ["R", "U2", "F'", "L", "D", "B2", "R'", "U", "F2", "D'",
+                    "L2", "B", "U'", "R2", "F", "D2", "L'", "B'", "U2", "R"]
+        cube_model = CubeModel.from_moves(scramble)
+        solver = TwoPhaseSolver(table_dir=self.tmp_dir.name)
+
+        solution = solver.solve(cube_model)
+
+        cube_model.apply(solution)
+        self.assertTrue(cube_model.is_solved())
+        self.assertLessEqual(len(solution), len(scramble) + 5)
+
+    def test_unsolvable_cube_stops_at_timeout(self):
+        # UR and UF edges swapped: odd permutation, phase 2 never succeeds
+        state = bytearray(CubeModel().state)
+        state[5], state[7] = state[7], state[5]
+        state[10], state[19] = state[19], state[10]
+        cube_model = CubeModel()
+        cube_model.state = bytes(state)
+        solver = TwoPhaseSolver(timeout=0.2, table_dir=self.tmp_dir.name)
+
+        self.assertIsNone(solver.solve(cube_model))
+        self.assertLess(solver.stats.elapsed, 1.0)
+
+    def test_missing_tables(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with self.assertRaises(TablesNotFound):
+                TwoPhaseSolver(table_dir=tmp_dir).solve(CubeModel.from_moves(["R"]))
+            self.assertListEqual(os.listdir(tmp_dir), [])
+
+    def test_cube_solver_configuration(self):
+        cube = Cube(solver='two_phase')
+
+        self.assertIsInstance(cube.solver.solver, TwoPhaseSolver)
+
+class FacesToDrawTestCase(unittest.TestCase):
+    def test_only_outer_faces_at_rest(self):
+        cube = Cube()
+        cube.rotate_cube('y', 3.75)
+        cube.rotate_cube('x', -0.44)
+
+        faces = cube.faces_to_draw(offset=(200, 300))
+
+        self.assertEqual(len(faces), 27)
+        self.assertNotIn(FACE_COLOR_INNER, [color for _, _, color, _ in faces])
+        depths = [depth for depth, _, _, _ in faces]
+        self.assertListEqual(depths, sorted(depths, reverse=True))
+        self.assertEqual(len(faces[0][1]), 4)
+
+    def test_inner_faces_while_turning(self):
+        cube = Cube()
+        cube.rotate_cube('y', 3.75)
+        cube.rotate_cube('x', -0.44)
+        cube.play_moves(["R"])
+        cube.update()
+
+        faces = cube.faces_to_draw()
+
+        self.assertIn(FACE_COLOR_INNER, [color for _, _, color, _ in faces])
+        self.assertLess(len(faces), 27 * 6)
+
+class FrameProfilerTestCase(unittest.TestCase):
+    def test_profile_view_frames(self):
+        view = RubiksCubeView()
+        profiler = view.enable_profiler(capacity=8)
+        view.cube.play_moves(["R", "U"])
+
+        for _ in range(12):
+            view.update()
+            view.draw()
+        view.update()
+
+        self.assertEqual(profiler.count, 12)
+        summary = profiler.summary()
+        self.assertListEqual(list(summary), STAGES + ['frame'])
+        for stage in STAGES:
+            self.assertGreater(summary[stage]['max'], 0)
+            self.assertLessEqual(summary[stage]['p50'], summary[stage]['p95'])
+        out = io.StringIO()
+        profiler.write_csv(out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 1 + 8)
+        self.assertTrue(lines[1].startswith('4,'))
+
+        view.disable_profiler()
+        view.update()
+        view.draw()
+        self.assertEqual(profiler.count, 12)
+
+    def test_dropped_frames(self):
+        profiler = FrameProfiler(frame_budget=0.0)
+
+        profiler.begin_frame()
+        profiler.mark('cube_update')
+        profiler.begin_frame()
+
+        self.assertEqual((profiler.count, profiler.dropped), (1, 1))
+
+class BrokenSolver(Solver):
+    # Raises the given error, or finds no solution when there is none
+    def __init__(self, error=None):
+        self.error = error
+        self.stats = SolveStats()
+        self.current = self
+
+    def solve(self, cube, budget=None):
+        if self.error:
+            raise self.error
+        return None
+
+class AsyncSolveTestCase(unittest.TestCase):
+    def run_view(self, view):
+        for _ in range(10000):
+            view.update()
+            if not view.cube.is_solving() and view._waiting_idle:
+                return
+        self.fail('View did not become idle.')
+
+    def test_solve_in_background(self):
+        view = RubiksCubeView()
+        view.cube.logic = CubeModel.from_moves(["R", "U", "F"])
+
+        view.click_action(None)
+
+        self.assertEqual(view.btn.btn.title, 'Cancel')
+        self.run_view(view)
+        self.assertTrue(view.cube.logic.is_solved())
+        self.assertEqual(view.btn.btn.title, 'Scramble')
+        self.assertEqual(view.info_label.label.text, 'Ready')
+
+    def test_cancel_solve(self):
+        view = RubiksCubeView()
+        scramble = ["R", "U", "F", "L", "D", "B", "R", "U", "F'", "L2", "D'", "B2"]
+        view.cube.logic = CubeModel.from_moves(scramble)
+
+        view.click_action(None)
+        view.update()
+        view.click_action(None)
+
+        self.assertRaises(SearchCancelled, view.cube._solve_future.result, 5)
+        self.run_view(view)
+        self.assertEqual(view.cube.logic.state, CubeModel.from_moves(scramble).state)
+        self.assertEqual(view.btn.btn.title, 'Solve')
+
+    def test_failed_solve_leaves_view_idle(self):
+        for solver, message in ((BrokenSolver(Exception('broken table')), 'Solve failed: broken table'),
+                                (BrokenSolver(), 'Solve failed: no solution')):
+            with self.subTest(message=message):
+                view = RubiksCubeView()
+                scramble = ["R", "U", "F"]
+                view.cube.logic = CubeModel.from_moves(scramble)
+                view.cube.solver = solver
+
+                view.click_action(None)
+                self.run_view(view)
+
+                self.assertEqual(view.cube.logic.state, CubeModel.from_moves(scramble).state)
+                self.assertEqual(view.btn.btn.title, 'Solve')
+                self.assertEqual(view.info_label.label.text, message)
+                view.click_move('U')
+                self.run_view(view)
+                self.assertEqual(view.info_label.label.text, 'Ready')
+
+    def test_solve_progress(self):
+        cube = Cube()
+        cube.logic = CubeModel.from_moves(["U'", "D", "F'", "B'", "L", "R'"])
+
+        cube.solve_async().result(5)
+        threshold, nodes = cube.solve_progress()
+
+        self.assertGreaterEqual(threshold, 6)
+        self.assertGreater(nodes, 0)
+        play_moves(cube, [])
+        self.assertFalse(cube.is_solving())
+
+class AnytimeSolverTestCase(unittest.TestCase):
+    def test_optimal_within_budget(self):
+        solver = AnytimeSolver(IdaStarSolver(), BeginnerSolver(), timeout=10)
+
+        solution = solver.solve(CubeModel.from_moves(["R", "U", "F"]))
+
+        self.assertListEqual(solution, ["F'", "U'", "R'"])
+        self.assertTrue(solver.stats.optimal)
+        self.assertFalse(solver.fell_back)
+
+    def test_fallback_when_node_budget_runs_out(self):
+        solver = AnytimeSolver(IdaStarSolver(), BeginnerSolver(), max_nodes=2048)
+        cube_model = CubeModel.from_moves(["R", "U", "F", "L", "D", "B", "R", "U"])
+
+        solution = solver.solve(cube_model)
+
+        self.assertTrue(solver.fell_back)
+        self.assertFalse(solver.stats.optimal)
+        cube_model.apply(solution)
+        self.assertTrue(cube_model.is_solved())
+
+    def test_fallback_when_solver_gives_up(self):
+        solver = AnytimeSolver(IdaStarSolver(max_depth=2), BeginnerSolver(), timeout=10)
+        cube_model = CubeModel.from_moves(["R", "U", "F", "L"])
+
+        solution = solver.solve(cube_model)
+
+        self.assertTrue(solver.fell_back)
+        self.assertFalse(solver.stats.optimal)
+        cube_model.apply(solution)
+        self.assertTrue(cube_model.is_solved())
+
+    def test_fallback_without_two_phase_tables(self):
+        cube_model = CubeModel.from_moves(["R", "U", "F", "L", "D", "B", "R", "U"])
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            solver = AnytimeSolver(IdaStarSolver(), TwoPhaseSolver(table_dir=tmp_dir), max_nodes=2048)
+
+            solution = solver.solve(cube_model)
+
+        self.assertTrue(solver.fell_back)
+        self.assertFalse(solver.stats.optimal)
+        self.assertIs(solver.current, solver.last_resort)
+        cube_model.apply(solution)
+        self.assertTrue(cube_model.is_solved())
+
+    def test_cancelled_token_raises(self):
+        token = CancellationToken()
+        token.cancel()
+
+        with self.assertRaises(SearchCancelled):
+            IdaStarSolver().solve(CubeModel.from_moves(["R", "U", "F", "L", "D", "B", "R", "U"]),
+                                  SearchBudget(token=token))
+        with self.assertRaises(SearchCancelled):
+            BidirectionalSolver(max_bytes=64 * 1024).solve(
+                CubeModel.from_moves(["R", "U", "F", "L", "D", "B", "R", "U"]), SearchBudget(timeout=0))
+
 if __name__ == '__main__':
     unittest.main()
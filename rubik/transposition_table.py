@@ -0,0 +1,66 @@
+# ---------- Transposition table for IDA* ----------
+# Fixed-size, direct-mapped table of lower bounds on the number of moves
+# needed to solve a state. Keys are 64 bit hashes of the state (plus the
+# search context the bound was computed in), so an entry costs ENTRY_BYTES
+# no matter how large the cube state is. Bounds are distances to the solved
+# state, so they stay valid across iterations and across solves.
+#
+# With canonical move sequences the same state is rarely reached twice within
+# one search, so a single solve saves only a few nodes. The table pays off
+# when a position is searched again: a solve cut short by its budget and
+# retried with the same table goes on from the bounds of the finished
+# subtrees instead of starting over (python benchmarks.py transposition_table).
+
+from array import array
+
+ENTRY_BYTES = 11  # key (8) + bound (1) + depth (1) + generation (1)
+MAX_VALUE = 255
+
+class TranspositionTable:
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.size = max(1, max_bytes // ENTRY_BYTES)
+        self.keys = array('q', [0]) * self.size
+        self.bounds = bytearray(self.size)
+        # Remaining search depth below the entry: the work it saves
+        self.depths = bytearray(self.size)
+        # IDA* iteration the entry was stored in, 0 marks an empty slot
+        self.generations = bytearray(self.size)
+        self.generation = 1
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def new_generation(self):
+        self.generation = self.generation % MAX_VALUE + 1
+
+    def get(self, key):
+        i = key % self.size
+        if self.generations[i] and self.keys[i] == key:
+            self.hits += 1
+            return self.bounds[i]
+        self.misses += 1
+        return 0
+
+    def put(self, key, bound, depth):
+        i = key % self.size
+        if self.generations[i]:
+            if self.keys[i] == key:
+                bound = max(bound, self.bounds[i])
+            elif self.generations[i] == self.generation and self.depths[i] > depth:
+                # Keep the more expensive subtree of the current iteration
+                return
+            else:
+                self.evictions += 1
+        self.keys[i] = key
+        self.bounds[i] = min(bound, MAX_VALUE)
+        self.depths[i] = min(depth, MAX_VALUE)
+        self.generations[i] = self.generation
+        self.stores += 1
@@ -0,0 +1,414 @@
+# ---------- Kociemba two-phase solver ----------
+# Phase 1 brings the cube into the subgroup <U, D, R2, L2, F2, B2>: all corner
+# twists and edge flips are zero and the four middle slice edges are in the
+# slice. Phase 2 solves the cube within that subgroup. Both phases run IDA*
+# over small coordinates with precomputed move and pruning tables:
+#   phase 1: twist (3^7), flip (2^11), slice edge positions (12 choose 4)
+#   phase 2: corner permutation (8!), U/D edge permutation (8!), slice permutation (4!)
+# Tables are built offline with numpy (python two_phase_solver.py [directory],
+# a few seconds) and stored in the pattern database directory.
+
+from math import comb, factorial
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+from cube_model import CubeModel
+from solver import Solver, SolveStats, SearchBudget, SearchCancelled
+from ida_star_solver import MOVES, STOP_CHECK_MASK
+from pattern_database import CORNERS, EDGES, PDB_DIR
+
+N_TWIST = 3 ** 7
+N_FLIP = 2 ** 11
+N_SLICE = comb(12, 4)
+N_SLICE_PERM = factorial(4)
+
+SLICE_EDGES = (8, 9, 10, 11)  # FR FL BL BR
+PHASE2_MOVES = [MOVES.index(m) for m in ['U', "U'", 'U2', 'D', "D'", 'D2', 'R2', 'L2', 'F2', 'B2']]
+# Phase 2 needs up to 18 moves, but capping it keeps failing phase 2 searches
+# cheap; a longer phase 1 then finds a short phase 2 instead.
+PHASE2_MAX_DEPTH = 12
+# Phase 1 never needs more than 12 moves
+PHASE1_MAX_DEPTH = 12
+
+TABLES_FILE = 'two_phase.npz'
+
+# Placement code (slot * orientations + twist) transitions per move index
+CORNER_CODE_MOVES = [CORNERS.code_moves[m].tolist() for m in MOVES]
+EDGE_CODE_MOVES = [EDGES.code_moves[m].tolist() for m in MOVES]
+
+# ---- Coordinates of slot arrays (cp/ep: cubie in slot, co/eo: twist in slot) ----
+
+def twist_coord(co):
+    t = 0
+    for k in co[:7]:
+        t = t * 3 + k
+    return t
+
+def flip_coord(eo):
+    f = 0
+    for k in eo[:11]:
+        f = f * 2 + k
+    return f
+
+def slice_coord(ep):
+    # Rank of the set of slots holding slice edges (combinatorial number system)
+    rank = 0
+    i = 0
+    for slot, cubie in enumerate(ep):
+        if cubie in SLICE_EDGES:
+            i += 1
+            rank += comb(slot, i)
+    return rank
+
+def permutation_coord(p):
+    rank = 0
+    n = len(p)
+    for i in range(n):
+        rank += sum(1 for j in range(i + 1, n) if p[j] < p[i]) * factorial(n - 1 - i)
+    return rank
+
+SOLVED_SLICE = slice_coord(list(range(12)))
+
+def _twist_from_coord(t):
+    co = [0] * 8
+    for i in range(6, -1, -1):
+        t, co[i] = divmod(t, 3)
+    co[7] = -sum(co[:7]) % 3
+    return co
+
+def _flip_from_coord(f):
+    eo = [0] * 12
+    for i in range(10, -1, -1):
+        f, eo[i] = divmod(f, 2)
+    eo[11] = sum(eo[:11]) % 2
+    return eo
+
+def _slice_from_coord(rank):
+    ep = [-1] * 12
+    k = len(SLICE_EDGES)
+    for slot in range(11, -1, -1):
+        if k and comb(slot, k) <= rank:
+            rank -= comb(slot, k)
+            k -= 1
+            ep[slot] = SLICE_EDGES[k]
+    return ep
+
+def _move_slots(slots, twists, code_moves, o):
+    new_slots = [0] * len(slots)
+    new_twists = [0] * len(slots)
+    for s, (cubie, k) in enumerate(zip(slots, twists)):
+        slot, twist = divmod(code_moves[s * o + k], o)
+        new_slots[slot] = cubie
+        new_twists[slot] = twist
+    return new_slots, new_twists
+
+def _orientation_move_table(n, from_coord, to_coord, num_of_slots, code_moves, o):
+    table = []
+    for c in range(n):
+        twists = from_coord(c)
+        table.append([to_coord(_move_slots([0] * num_of_slots, twists, moves, o)[1]) for moves in code_moves])
+    return table
+
+def _slice_move_table():
+    table = []
+    for c in range(N_SLICE):
+        ep = _slice_from_coord(c)
+        table.append([slice_coord(_move_slots(ep, [0] * 12, moves, 2)[0]) for moves in EDGE_CODE_MOVES])
+    return table
+
+# ---- Vectorized permutation coordinates for the 8! tables ----
+
+def _rank_permutations(p):
+    n = p.shape[1]
+    rank = np.zeros(len(p), dtype=np.int64)
+    for i in range(n):
+        smaller = (p[:, i + 1:] < p[:, i:i + 1]).sum(axis=1)
+        rank += smaller * factorial(n - 1 - i)
+    return rank
+
+def _unrank_permutations(rank, n):
+    p = np.zeros((len(rank), n), dtype=np.int64)
+    free = np.ones((len(rank), n), dtype=bool)
+    rows = np.arange(len(rank))
+    for i in range(n):
+        digit, rank = np.divmod(rank, factorial(n - 1 - i))
+        nth_free = np.cumsum(free, axis=1) - 1
+        p[:, i] = np.argmax(free & (nth_free == digit[:, None]), axis=1)
+        free[rows, p[:, i]] = False
+    return p
+
+def _permutation_move_table(n, slots, code_moves, o, moves):
+    # Permutation of cubies over the given slots; moves must keep those slots closed
+    p = _unrank_permutations(np.arange(factorial(n), dtype=np.int64), n)
+    table = np.zeros((len(p), len(MOVES)), dtype=np.int64)
+    for m in moves:
+        destination = [code_moves[m][slot * o] // o - slots[0] for slot in slots]
+        moved = np.empty_like(p)
+        moved[:, destination] = p
+        table[:, m] = _rank_permutations(moved)
+    return table
+
+def _pruning_table(move_a, move_b, size_b, goal, moves):
+    # Breadth-first distances over pairs of coordinates: index = a * size_b + b.
+    # Every level is read back from the table instead of collecting children.
+    # Once fewer entries are unseen than in the frontier, the unseen ones look
+    # for a parent instead (the move sets are closed under inverses).
+    move_a = np.asarray(move_a, dtype=np.int32)
+    move_b = np.asarray(move_b, dtype=np.int32)
+    depths = np.full(len(move_a) * size_b, 255, dtype=np.uint8)
+    depths[goal] = 0
+    depth = 0
+    while True:
+        frontier = np.flatnonzero(depths == depth)
+        if not frontier.size:
+            return depths
+        unseen = np.flatnonzero(depths == 255)
+        if unseen.size < frontier.size:
+            a, b = np.divmod(unseen, size_b)
+            found = np.zeros(unseen.size, dtype=bool)
+            for m in moves:
+                found |= depths[move_a[a, m] * size_b + move_b[b, m]] == depth
+            depths[unseen[found]] = depth + 1
+        else:
+            a, b = np.divmod(frontier, size_b)
+            for m in moves:
+                child = move_a[a, m] * size_b + move_b[b, m]
+                depths[child[depths[child] == 255]] = depth + 1
+        depth += 1
+
+def build_tables():
+    all_moves = range(len(MOVES))
+    twist_move = _orientation_move_table(N_TWIST, _twist_from_coord, twist_coord, 8, CORNER_CODE_MOVES, 3)
+    flip_move = _orientation_move_table(N_FLIP, _flip_from_coord, flip_coord, 12, EDGE_CODE_MOVES, 2)
+    slice_move = _slice_move_table()
+    corner_perm_move = _permutation_move_table(8, range(8), CORNER_CODE_MOVES, 3, PHASE2_MOVES)
+    edge_perm_move = _permutation_move_table(8, range(8), EDGE_CODE_MOVES, 2, PHASE2_MOVES)
+    slice_perm_move = _permutation_move_table(4, range(8, 12), EDGE_CODE_MOVES, 2, PHASE2_MOVES)
+    return {
+        'twist_move': np.array(twist_move, dtype=np.int64),
+        'flip_move': np.array(flip_move, dtype=np.int64),
+        'slice_move': np.array(slice_move, dtype=np.int64),
+        'corner_perm_move': corner_perm_move,
+        'edge_perm_move': edge_perm_move,
+        'slice_perm_move': slice_perm_move,
+        'twist_slice_prune': _pruning_table(twist_move, slice_move, N_SLICE, SOLVED_SLICE, all_moves),
+        'flip_slice_prune': _pruning_table(flip_move, slice_move, N_SLICE, SOLVED_SLICE, all_moves),
+        'corner_slice_prune': _pruning_table(corner_perm_move, slice_perm_move, N_SLICE_PERM, 0, PHASE2_MOVES),
+        'edge_slice_prune': _pruning_table(edge_perm_move, slice_perm_move, N_SLICE_PERM, 0, PHASE2_MOVES),
+    }
+
+def tables_path(directory=PDB_DIR):
+    return os.path.join(directory, TABLES_FILE)
+
+def generate_tables(directory=PDB_DIR):
+    path = tables_path(directory)
+    logging.info('Build two-phase tables: %s', path)
+    tables = build_tables()
+    os.makedirs(directory, exist_ok=True)
+    np.savez_compressed(path, **tables)
+    return path
+
+class TablesNotFound(Exception):
+    # The table file has not been built (python two_phase_solver.py)
+    pass
+
+class TwoPhaseTables:
+    def __init__(self, directory=PDB_DIR):
+        path = tables_path(directory)
+        if not os.path.exists(path):
+            raise TablesNotFound(f'Two-phase tables not found: {path}. Build them with: python two_phase_solver.py')
+        tables = dict(np.load(path))
+        # Plain lists and bytes index much faster than numpy arrays in the search
+        for name, table in tables.items():
+            setattr(self, name, table.tobytes() if name.endswith('_prune') else table.tolist())
+
+_tables = {}
+
+def load_tables(directory=PDB_DIR):
+    if directory not in _tables:
+        _tables[directory] = TwoPhaseTables(directory)
+    return _tables[directory]
+
+class SearchStopped(Exception):
+    # Timeout or budget ran out in the middle of the search
+    pass
+
+def _successors(moves):
+    # Last face (+1, 0 at the root) -> (move, face) pairs allowed next: never
+    # the same face twice, opposite faces only in one order
+    table = []
+    for last_face in range(-1, 6):
+        table.append([(m, m // 3) for m in moves
+                      if m // 3 != last_face and not (m // 6 == last_face // 2 and m // 3 < last_face)])
+    return table
+
+PHASE1_SUCCESSORS = _successors(range(len(MOVES)))
+PHASE2_SUCCESSORS = _successors(PHASE2_MOVES)
+
+class TwoPhaseSolver(Solver):
+    # Returns the first solution of at most max_length moves. When the first
+    # solution is longer it is improved on until timeout seconds have passed.
+    # The timeout also ends a search that has found nothing (solve() returns
+    # None), as does a phase 1 deeper than PHASE1_MAX_DEPTH.
+    def __init__(self, max_length=23, timeout=2.0, table_dir=PDB_DIR):
+        self.max_length = max_length
+        self.timeout = timeout
+        self.table_dir = table_dir
+        self._budget = None
+        self.stats = SolveStats()
+
+    def solve(self, cube: CubeModel, budget: SearchBudget = None) -> list:
+        # When the budget runs out the best solution so far is returned, or
+        # SearchCancelled is raised if there is none yet
+        self.stats = SolveStats()
+        started = time.perf_counter()
+        self._tables = load_tables(self.table_dir)
+        self._budget = budget
+        self._deadline = started + self.timeout
+        self._corners = [slot * 3 + twist for slot, twist in CORNERS.placements(cube.state)]
+        self._edges = [slot * 2 + twist for slot, twist in EDGES.placements(cube.state)]
+        self._best = None
+        self._path = []
+
+        cp, co = self._slot_arrays(self._corners, 3)
+        ep, eo = self._slot_arrays(self._edges, 2)
+        twist, flip, slice_ = twist_coord(co), flip_coord(eo), slice_coord(ep)
+        depth = self._phase1_heuristic(twist, flip, slice_)
+        try:
+            while depth <= PHASE1_MAX_DEPTH and (self._best is None or depth < len(self._best)):
+                self.stats.threshold = depth
+                if self._phase1(twist, flip, slice_, depth, -1):
+                    break
+                depth += 1
+        except SearchStopped:
+            if self._best is None and budget is not None and budget.exhausted(self.stats.nodes):
+                raise SearchCancelled()
+        finally:
+            self.stats.elapsed = time.perf_counter() - started
+        if self._best is None:
+            logging.warning('Two-phase search found no solution in %.2fs (phase 1 depth %d).',
+                            self.stats.elapsed, depth)
+            return None
+        return [MOVES[m] for m in self._best]
+
+    def _slot_arrays(self, codes, o):
+        slots = [0] * len(codes)
+        twists = [0] * len(codes)
+        for cubie, code in enumerate(codes):
+            slot, twist = divmod(code, o)
+            slots[slot] = cubie
+            twists[slot] = twist
+        return slots, twists
+
+    def _phase1_heuristic(self, twist, flip, slice_):
+        t = self._tables
+        return max(t.twist_slice_prune[twist * N_SLICE + slice_], t.flip_slice_prune[flip * N_SLICE + slice_])
+
+    def _check_stop(self):
+        # Polled every STOP_CHECK_MASK + 1 nodes of both phases
+        budget = self._budget
+        if time.perf_counter() > self._deadline or (budget is not None and budget.exhausted(self.stats.nodes)):
+            raise SearchStopped()
+
+    def _phase1(self, twist, flip, slice_, togo, last_face):
+        # Depth first search for phase 1 solutions of exactly togo more moves,
+        # True ends the search
+        stats = self.stats
+        stats.nodes += 1
+        if not stats.nodes & STOP_CHECK_MASK:
+            self._check_stop()
+        if togo == 0:
+            path = self._path
+            # A phase 2 move at the end means a shorter phase 1 solution was already tried
+            if path and path[-1] in PHASE2_MOVES:
+                return False
+            return self._start_phase2()
+        t = self._tables
+        twist_moves = t.twist_move[twist]
+        flip_moves = t.flip_move[flip]
+        slice_moves = t.slice_move[slice_]
+        twist_prune = t.twist_slice_prune
+        flip_prune = t.flip_slice_prune
+        path = self._path
+        for m, face in PHASE1_SUCCESSORS[last_face + 1]:
+            slice2 = slice_moves[m]
+            twist2 = twist_moves[m]
+            if twist_prune[twist2 * N_SLICE + slice2] >= togo:
+                continue
+            flip2 = flip_moves[m]
+            if flip_prune[flip2 * N_SLICE + slice2] >= togo:
+                continue
+            path.append(m)
+            if self._phase1(twist2, flip2, slice2, togo - 1, face):
+                return True
+            path.pop()
+        return False
+
+    def _start_phase2(self):
+        corners = list(self._corners)
+        edges = list(self._edges)
+        for m in self._path:
+            corners = [CORNER_CODE_MOVES[m][c] for c in corners]
+            edges = [EDGE_CODE_MOVES[m][e] for e in edges]
+        cp, _ = self._slot_arrays(corners, 3)
+        ep, _ = self._slot_arrays(edges, 2)
+        corner_perm = permutation_coord(cp)
+        edge_perm = permutation_coord(ep[:8])
+        slice_perm = permutation_coord([e - 8 for e in ep[8:]])
+
+        phase1_length = len(self._path)
+        if self._best is None:
+            limit = PHASE2_MAX_DEPTH
+        else:
+            limit = min(PHASE2_MAX_DEPTH, len(self._best) - 1 - phase1_length)
+        depth = self._phase2_heuristic(corner_perm, edge_perm, slice_perm)
+        last_face = self._path[-1] // 3 if self._path else -1
+        while depth <= limit:
+            if self._phase2(corner_perm, edge_perm, slice_perm, depth, last_face):
+                self._best = list(self._path)
+                logging.debug('Two-phase solution: %d + %d moves', phase1_length, depth)
+                del self._path[phase1_length:]
+                return len(self._best) <= self.max_length
+            depth += 1
+        return False
+
+    def _phase2_heuristic(self, corner_perm, edge_perm, slice_perm):
+        t = self._tables
+        return max(t.corner_slice_prune[corner_perm * N_SLICE_PERM + slice_perm],
+                   t.edge_slice_prune[edge_perm * N_SLICE_PERM + slice_perm])
+
+    def _phase2(self, corner_perm, edge_perm, slice_perm, togo, last_face):
+        stats = self.stats
+        stats.nodes += 1
+        if not stats.nodes & STOP_CHECK_MASK:
+            self._check_stop()
+        if togo == 0:
+            return corner_perm == 0 and edge_perm == 0 and slice_perm == 0
+        t = self._tables
+        corner_moves = t.corner_perm_move[corner_perm]
+        edge_moves = t.edge_perm_move[edge_perm]
+        slice_moves = t.slice_perm_move[slice_perm]
+        corner_prune = t.corner_slice_prune
+        edge_prune = t.edge_slice_prune
+        path = self._path
+        for m, face in PHASE2_SUCCESSORS[last_face + 1]:
+            slice_perm2 = slice_moves[m]
+            corner_perm2 = corner_moves[m]
+            if corner_prune[corner_perm2 * N_SLICE_PERM + slice_perm2] >= togo:
+                continue
+            edge_perm2 = edge_moves[m]
+            if edge_prune[edge_perm2 * N_SLICE_PERM + slice_perm2] >= togo:
+                continue
+            path.append(m)
+            if self._phase2(corner_perm2, edge_perm2, slice_perm2, togo - 1, face):
+                return True
+            path.pop()
+        return False
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    generate_tables(sys.argv[1] if len(sys.argv) > 1 else PDB_DIR)